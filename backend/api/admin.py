@@ -0,0 +1,59 @@
+"""
+Admin API Routes
+"""
+
+import os
+import secrets
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from pydantic import BaseModel
+
+from db.async_database import get_async_engine
+from db.query_log import SORT_KEYS
+
+router = APIRouter()
+
+# Admin routes are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+
+class QueryStat(BaseModel):
+    id: str
+    fingerprint: str
+    calls: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    rows: int
+
+
+class QueryStatsResponse(BaseModel):
+    slow_query_ms: float
+    queries: List[QueryStat]
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency that checks the X-Admin-Token header against ADMIN_TOKEN"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/queries", response_model=QueryStatsResponse, dependencies=[Depends(require_admin)])
+async def get_query_stats(
+    limit: int = Query(20, ge=1, le=1000),
+    sort: str = Query("total_ms", pattern=f"^({'|'.join(SORT_KEYS)})$"),
+    db=Depends(get_async_engine),
+):
+    """Top query fingerprints in this worker since start or the last reset"""
+    stats = db.sync.query_stats
+    return {"slow_query_ms": stats.slow_query_ms, "queries": stats.top(limit, sort)}
+
+
+@router.delete("/queries", dependencies=[Depends(require_admin)])
+async def reset_query_stats(db=Depends(get_async_engine)):
+    """Clear the query statistics"""
+    db.sync.query_stats.reset()
+    return {"message": "Query statistics reset"}
@@ -2,15 +2,22 @@
 Authentication API Routes
 """
 
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 
-from services.auth_service import AuthService
-from services.user_service import UserService
-from db.database import get_db
+from services.auth_service import AsyncAuthService
+from services.user_service import AsyncUserService, DuplicateEmail
+from services.passwords import PasswordHasherBusy
+from services.tokens import decode_token
+from db.async_database import get_async_engine
 
 router = APIRouter()
 
+_bearer = HTTPBearer(auto_error=False)
+
 
 class LoginRequest(BaseModel):
     email: str
@@ -29,40 +36,53 @@ class TokenResponse(BaseModel):
     user_id: int
 
 
+def raise_busy():
+    """Shed load when the password hasher's queue is full"""
+    raise HTTPException(
+        status_code=503,
+        detail="Too many authentication requests, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/login", response_model=TokenResponse)
-async def login(credentials: LoginRequest, db=Depends(get_db)):
-    """Login with email and password"""
-    auth_service = AuthService(db)
-    result = auth_service.authenticate(credentials.email, credentials.password)
+async def login(credentials: LoginRequest, engine=Depends(get_async_engine)):
+    """Login with email and password
+
+    The user lookup borrows a pooled connection only for the query, so
+    none is held while the password is verified.
+    """
+    auth_service = AsyncAuthService(engine)
+    try:
+        result = await auth_service.authenticate(credentials.email, credentials.password)
+    except PasswordHasherBusy:
+        raise_busy()
     if not result:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return result
 
 
 @router.post("/register", response_model=TokenResponse)
-async def register(data: RegisterRequest, db=Depends(get_db)):
+async def register(data: RegisterRequest, engine=Depends(get_async_engine)):
     """Register a new user"""
-    user_service = UserService(db)
-    auth_service = AuthService(db)
-
-    # Check if email exists
-    existing = user_service.get_user_by_email(data.email)
-    if existing:
+    try:
+        user = await AsyncUserService(engine).register(
+            email=data.email,
+            username=data.username,
+            password=data.password
+        )
+    except DuplicateEmail:
         raise HTTPException(status_code=400, detail="Email already registered")
-
-    # Create user
-    user = user_service.create_user(
-        email=data.email,
-        username=data.username,
-        password=data.password
-    )
+    except PasswordHasherBusy:
+        raise_busy()
 
     # Generate token
-    token = auth_service.generate_token(user.id)
+    auth_service = AsyncAuthService(engine)
+    token = auth_service.generate_token(user["id"], email=user["email"], username=user["username"])
     return {
         "access_token": token,
         "token_type": "bearer",
-        "user_id": user.id
+        "user_id": user["id"]
     }
 
 
@@ -72,8 +92,21 @@ async def logout():
     return {"message": "Logged out successfully"}
 
 
+async def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> dict:
+    """Dependency resolving the bearer token to its user, without a database hit"""
+    claims = decode_token(credentials.credentials) if credentials else None
+    if claims is None:
+        raise HTTPException(
+            status_code=401,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {"id": claims["user_id"], "email": claims.get("email"), "username": claims.get("username")}
+
+
 @router.get("/me")
-async def get_current_user(db=Depends(get_db)):
+async def read_current_user(user: dict = Depends(get_current_user)):
     """Get current authenticated user"""
-    # This would normally extract user from JWT token
-    return {"id": 1, "email": "user@example.com", "username": "user"}
+    return user
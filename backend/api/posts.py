@@ -2,12 +2,18 @@
 Posts API Routes
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, Body, HTTPException, Depends, Query, Request, Response
+from pydantic import AliasChoices, BaseModel, Field
 from typing import List, Optional
 
-from services.post_service import PostService
-from db.database import get_db
+from api.users import UserResponse, user_body
+from services.post_service import AsyncPostService, UnknownAuthor
+from services.pagination import InvalidCursor, MAX_PAGE_SIZE
+from api.responses import (
+    BulkItemResult, MAX_BULK_ITEMS, bulk_results, ndjson_response, set_page_headers,
+    fast_json, not_modified, page_etag, row_etag, set_etag,
+)
+from db.async_database import get_async_db, get_async_engine
 
 router = APIRouter()
 
@@ -27,63 +33,200 @@ class PostResponse(BaseModel):
     id: int
     title: str
     content: str
-    author_id: int
+    author_id: int = Field(validation_alias=AliasChoices("author_id", "user_id"))
     created_at: str
+    author: Optional[UserResponse] = None
+
+
+class PostSearchResult(PostResponse):
+    snippet: str
+
+
+def post_body(post: dict) -> dict:
+    """Shape a post row like PostResponse without building the model.
+
+    ``author`` is only present when the row was expanded, matching
+    response_model_exclude_unset.
+    """
+    body = {
+        "id": post["id"],
+        "title": post["title"],
+        "content": post["content"],
+        "author_id": post["user_id"],
+        "created_at": post["created_at"],
+    }
+    if "author" in post:
+        body["author"] = user_body(post["author"]) if post["author"] else None
+    return body
+
+
+@router.get("/", response_model=List[PostResponse], response_model_exclude_unset=True)
+async def get_posts(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    expand: Optional[str] = Query(None, pattern="^author$"),
+    with_total: bool = Query(False, description="Add an approximate X-Total-Count header"),
+    db=Depends(get_async_db, scope="function"),
+):
+    """Get all posts with pagination
+
+    Pass the X-Next-Cursor header of one page as ``after`` to fetch the next;
+    X-Has-More says whether there is one. An unchanged page answers 304 to
+    a matching If-None-Match.
+    """
+    post_service = AsyncPostService(db)
+    try:
+        posts, has_more = await post_service.get_posts_page(
+            skip=skip, limit=limit, after=after, expand_author=expand == "author"
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    etag = page_etag("posts", posts, has_more)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    set_etag(response, etag)
+    set_page_headers(
+        response,
+        has_more,
+        next_cursor=post_service.post_cursor(posts[-1]) if has_more else None,
+        total=await post_service.count_posts() if with_total else None,
+    )
+    return fast_json([post_body(post) for post in posts], response)
+
+
+@router.get("/export")
+async def export_posts(db=Depends(get_async_engine)):
+    """Stream every post as newline-delimited JSON"""
+    post_service = AsyncPostService(db)
+    return ndjson_response(post_service.iter_posts())
+
+
+@router.get("/search", response_model=List[PostSearchResult], response_model_exclude_unset=True)
+async def search_posts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words that must all appear"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    expand: Optional[str] = Query(None, pattern="^author$"),
+    db=Depends(get_async_db, scope="function"),
+):
+    """Full-text search over post titles and content, best match first
+
+    Each result carries an HTML-escaped snippet with the matches wrapped in
+    <mark>. Pass the X-Next-Cursor header of one page as ``after`` to fetch
+    the next.
+    """
+    post_service = AsyncPostService(db)
+    try:
+        posts, has_more = await post_service.search_posts(
+            q, limit=limit, after=after, expand_author=expand == "author"
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_page_headers(
+        response,
+        has_more,
+        next_cursor=post_service.search_cursor(posts[-1]) if has_more else None,
+    )
+    return fast_json([{**post_body(post), "snippet": post["snippet"]} for post in posts], response)
 
 
-@router.get("/", response_model=List[PostResponse])
-async def get_posts(skip: int = 0, limit: int = 50, db=Depends(get_db)):
-    """Get all posts with pagination"""
-    post_service = PostService(db)
-    posts = post_service.get_all_posts(skip=skip, limit=limit)
-    return posts
-
+@router.get("/{post_id}", response_model=PostResponse, response_model_exclude_unset=True)
+async def get_post(post_id: int, request: Request, response: Response, db=Depends(get_async_engine)):
+    """Get a specific post by ID
 
-@router.get("/{post_id}", response_model=PostResponse)
-async def get_post(post_id: int, db=Depends(get_db)):
-    """Get a specific post by ID"""
-    post_service = PostService(db)
-    post = post_service.get_post_by_id(post_id)
+    Answers 304 to a matching If-None-Match; a cached post needs no query.
+    """
+    post_service = AsyncPostService(db)
+    post = await post_service.get_post_by_id(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
+    etag = row_etag("post", post)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    set_etag(response, etag)
     return post
 
 
-@router.get("/user/{user_id}", response_model=List[PostResponse])
-async def get_user_posts(user_id: int, db=Depends(get_db)):
-    """Get all posts by a specific user"""
-    post_service = PostService(db)
-    posts = post_service.get_posts_by_user(user_id)
-    return posts
+@router.get("/user/{user_id}", response_model=List[PostResponse], response_model_exclude_unset=True)
+async def get_user_posts(
+    user_id: int,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    expand: Optional[str] = Query(None, pattern="^author$"),
+    db=Depends(get_async_db, scope="function"),
+):
+    """Get all posts by a specific user with pagination"""
+    post_service = AsyncPostService(db)
+    try:
+        posts, has_more = await post_service.get_user_posts_page(
+            user_id, skip=skip, limit=limit, after=after, expand_author=expand == "author"
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_page_headers(
+        response,
+        has_more,
+        next_cursor=post_service.post_cursor(posts[-1]) if has_more else None,
+    )
+    return fast_json([post_body(post) for post in posts], response)
 
 
-@router.post("/", response_model=PostResponse)
-async def create_post(post_data: PostCreate, db=Depends(get_db)):
+@router.post("/", response_model=PostResponse, response_model_exclude_unset=True)
+async def create_post(post_data: PostCreate, db=Depends(get_async_db, scope="function")):
     """Create a new post"""
-    post_service = PostService(db)
-    post = post_service.create_post(
-        title=post_data.title,
-        content=post_data.content,
-        author_id=post_data.author_id
-    )
+    post_service = AsyncPostService(db)
+    try:
+        post = await post_service.create_post(
+            title=post_data.title,
+            content=post_data.content,
+            user_id=post_data.author_id
+        )
+    except UnknownAuthor:
+        raise HTTPException(status_code=422, detail="Author not found")
     return post
 
 
-@router.put("/{post_id}", response_model=PostResponse)
-async def update_post(post_id: int, post_data: PostUpdate, db=Depends(get_db)):
+@router.post("/bulk", response_model=List[BulkItemResult], response_model_exclude_none=True)
+async def create_posts_bulk(
+    posts: List[PostCreate] = Body(max_length=MAX_BULK_ITEMS),
+    db=Depends(get_async_engine),
+):
+    """Create many posts in batched transactions, with one result per post
+
+    Runs on the engine rather than a request session, so each chunk
+    commits and releases the write lock before the next one starts.
+    """
+    post_service = AsyncPostService(db)
+    outcomes = await post_service.create_posts([
+        {"title": post.title, "content": post.content, "user_id": post.author_id}
+        for post in posts
+    ])
+    return bulk_results(outcomes)
+
+
+@router.put("/{post_id}", response_model=PostResponse, response_model_exclude_unset=True)
+async def update_post(post_id: int, post_data: PostUpdate, db=Depends(get_async_db, scope="function")):
     """Update an existing post"""
-    post_service = PostService(db)
-    post = post_service.update_post(post_id, post_data.dict(exclude_unset=True))
+    post_service = AsyncPostService(db)
+    post = await post_service.update_post(post_id, post_data.dict(exclude_unset=True))
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     return post
 
 
 @router.delete("/{post_id}")
-async def delete_post(post_id: int, db=Depends(get_db)):
+async def delete_post(post_id: int, db=Depends(get_async_db, scope="function")):
     """Delete a post"""
-    post_service = PostService(db)
-    success = post_service.delete_post(post_id)
+    post_service = AsyncPostService(db)
+    success = await post_service.delete_post(post_id)
     if not success:
         raise HTTPException(status_code=404, detail="Post not found")
     return {"message": "Post deleted successfully"}
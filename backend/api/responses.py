@@ -0,0 +1,128 @@
+"""
+Shared Response Helpers
+"""
+
+import hashlib
+import json
+from typing import AsyncIterator, Iterable, List, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+# Largest number of rows accepted by one bulk insert request
+MAX_BULK_ITEMS = 10_000
+# Bulk user creation pays the password hash cost per row, so it takes fewer
+MAX_BULK_USERS = 1_000
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def fast_json(content, response: Optional[Response] = None) -> FastJSONResponse:
+    """Send ``content`` as it is, serialised once.
+
+    Returning a response skips FastAPI's response_model validation, so the
+    content must already have the declared shape. Headers set on the
+    route's injected ``response`` are carried over.
+    """
+    fast = FastJSONResponse(content)
+    if response is not None:
+        fast.raw_headers.extend(response.headers.raw)
+    return fast
+
+
+def bulk_results(outcomes: List[dict]) -> List[dict]:
+    """Number per-item bulk insert outcomes by their position in the request."""
+    return [{"index": index, **outcome} for index, outcome in enumerate(outcomes)]
+
+
+def set_page_headers(
+    response: Response,
+    has_more: bool,
+    next_cursor: Optional[str] = None,
+    total: Optional[int] = None,
+):
+    """Describe a listing page in headers, so the body stays a plain list."""
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    if has_more and next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+
+
+def row_etag(kind: str, row: dict) -> str:
+    """Weak ETag for one row, from its id and version."""
+    return f'W/"{kind}-{row["id"]}-{row.get("version", 0)}"'
+
+
+def page_etag(kind: str, rows: Iterable[dict], has_more: bool) -> str:
+    """Weak ETag for a listing page, from the ids and versions it holds.
+
+    Embedded authors count too, so renaming one changes the tag.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for row in rows:
+        digest.update(f"{row['id']}:{row.get('version', 0)}".encode())
+        author = row.get("author")
+        if author:
+            digest.update(f"/{author['id']}:{author.get('version', 0)}".encode())
+        digest.update(b",")
+    digest.update(b"+" if has_more else b".")
+    return f'W/"{kind}-{digest.hexdigest()}"'
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response if the request's If-None-Match already names ``etag``.
+
+    Comparison is weak, as RFC 9110 requires for If-None-Match.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return None
+    current = etag.removeprefix("W/")
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == current:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
+
+
+def set_etag(response: Response, etag: str):
+    """Tag a response so clients can revalidate it with If-None-Match."""
+    response.headers["ETag"] = etag
+    # Let browsers keep the body but check back before every reuse.
+    response.headers["Cache-Control"] = "no-cache"
+
+
+async def _ndjson_lines(rows: AsyncIterator[dict], batch_size: int) -> AsyncIterator[str]:
+    batch = []
+    async for row in rows:
+        batch.append(json.dumps(row, separators=(",", ":")))
+        if len(batch) >= batch_size:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def ndjson_response(rows: AsyncIterator[dict], batch_size: int = 500) -> StreamingResponse:
+    """Stream rows as newline-delimited JSON, one body chunk per batch."""
+    return StreamingResponse(_ndjson_lines(rows, batch_size), media_type="application/x-ndjson")
@@ -2,12 +2,20 @@
 User API Routes
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import List, Optional
-
-from services.user_service import UserService
-from db.database import get_db
+from fastapi import APIRouter, Body, HTTPException, Depends, Query, Request, Response
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+from services.auth_service import AsyncAuthService
+from services.passwords import PasswordHasherBusy
+from services.user_service import AsyncUserService, DuplicateEmail
+from services.pagination import InvalidCursor, MAX_PAGE_SIZE
+from api.auth import raise_busy
+from api.responses import (
+    BulkItemResult, MAX_BULK_USERS, bulk_results, ndjson_response, set_page_headers,
+    fast_json, not_modified, row_etag, set_etag,
+)
+from db.async_database import get_async_db, get_async_engine
 
 router = APIRouter()
 
@@ -30,57 +38,147 @@ class UserResponse(BaseModel):
     is_active: bool
 
 
+def user_body(user: dict) -> dict:
+    """Shape a user row like UserResponse without building the model."""
+    return {
+        "id": user["id"],
+        "email": user["email"],
+        "username": user["username"],
+        "is_active": bool(user["is_active"]),
+    }
+
+
+class UserBatchRequest(BaseModel):
+    ids: List[int] = Field(max_length=MAX_PAGE_SIZE)
+
+
 @router.get("/", response_model=List[UserResponse])
-async def get_users(skip: int = 0, limit: int = 100, db=Depends(get_db)):
-    """Get all users with pagination"""
-    user_service = UserService(db)
-    users = user_service.get_all_users(skip=skip, limit=limit)
-    return users
+async def get_users(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    ids: Optional[str] = Query(None, description="Comma-separated user ids to fetch in one query"),
+    with_total: bool = Query(False, description="Add an approximate X-Total-Count header"),
+    db=Depends(get_async_db, scope="function"),
+):
+    """Get all users with pagination
+
+    Pass the X-Next-Cursor header of one page as ``after`` to fetch the next;
+    X-Has-More says whether there is one. With ``ids`` the listing is
+    replaced by a batch lookup of those users.
+    """
+    user_service = AsyncUserService(db)
+    if ids is not None:
+        try:
+            user_ids = [int(part) for part in ids.split(",") if part.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+        if len(user_ids) > MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_PAGE_SIZE} ids per request")
+        found = await user_service.get_users_by_ids(user_ids)
+        return fast_json([user_body(found[user_id]) for user_id in dict.fromkeys(user_ids) if user_id in found])
+
+    try:
+        users, has_more = await user_service.get_users_page(skip=skip, limit=limit, after=after)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    set_page_headers(
+        response,
+        has_more,
+        next_cursor=user_service.user_cursor(users[-1]) if has_more else None,
+        total=await user_service.count_users() if with_total else None,
+    )
+    return fast_json([user_body(user) for user in users], response)
+
+
+@router.get("/export")
+async def export_users(db=Depends(get_async_engine)):
+    """Stream every user as newline-delimited JSON"""
+    user_service = AsyncUserService(db)
+    return ndjson_response(user_service.iter_users())
+
+
+@router.post("/batch", response_model=Dict[int, UserResponse])
+async def get_users_batch(request: UserBatchRequest, db=Depends(get_async_db, scope="function")):
+    """Get many users in one round trip, keyed by id"""
+    user_service = AsyncUserService(db)
+    return await user_service.get_users_by_ids(request.ids)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db=Depends(get_db)):
-    """Get a specific user by ID"""
-    user_service = UserService(db)
-    user = user_service.get_user_by_id(user_id)
+async def get_user(user_id: int, request: Request, response: Response, db=Depends(get_async_engine)):
+    """Get a specific user by ID
+
+    Answers 304 to a matching If-None-Match; a cached user needs no query.
+    """
+    user_service = AsyncUserService(db)
+    user = await user_service.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    etag = row_etag("user", user)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    set_etag(response, etag)
     return user
 
 
 @router.post("/", response_model=UserResponse)
-async def create_user(user_data: UserCreate, db=Depends(get_db)):
+async def create_user(user_data: UserCreate, engine=Depends(get_async_engine)):
     """Create a new user"""
-    user_service = UserService(db)
-
-    # Check if email already exists
-    existing = user_service.get_user_by_email(user_data.email)
-    if existing:
+    try:
+        return await AsyncUserService(engine).register(
+            email=user_data.email,
+            username=user_data.username,
+            password=user_data.password
+        )
+    except DuplicateEmail:
         raise HTTPException(status_code=400, detail="Email already registered")
-
-    user = user_service.create_user(
-        email=user_data.email,
-        username=user_data.username,
-        password=user_data.password
-    )
-    return user
+    except PasswordHasherBusy:
+        raise_busy()
+
+
+@router.post("/bulk", response_model=List[BulkItemResult], response_model_exclude_none=True)
+async def create_users_bulk(
+    users: List[UserCreate] = Body(max_length=MAX_BULK_USERS),
+    engine=Depends(get_async_engine),
+):
+    """Create many users in batched transactions, with one result per user
+
+    Every password is hashed before a connection is checked out. The
+    inserts run on the engine rather than a session, so each chunk commits
+    and releases the write lock before the next one starts.
+    """
+    try:
+        passwords = await AsyncAuthService(engine).hash_passwords([user.password for user in users])
+    except PasswordHasherBusy:
+        raise_busy()
+    outcomes = await AsyncUserService(engine).create_users([
+        {"email": user.email, "username": user.username, "password": password}
+        for user, password in zip(users, passwords)
+    ])
+    return bulk_results(outcomes)
 
 
 @router.put("/{user_id}", response_model=UserResponse)
-async def update_user(user_id: int, user_data: UserUpdate, db=Depends(get_db)):
+async def update_user(user_id: int, user_data: UserUpdate, db=Depends(get_async_db, scope="function")):
     """Update an existing user"""
-    user_service = UserService(db)
-    user = user_service.update_user(user_id, user_data.dict(exclude_unset=True))
+    user_service = AsyncUserService(db)
+    try:
+        user = await user_service.update_user(user_id, user_data.dict(exclude_unset=True))
+    except DuplicateEmail:
+        raise HTTPException(status_code=400, detail="Email already registered")
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @router.delete("/{user_id}")
-async def delete_user(user_id: int, db=Depends(get_db)):
+async def delete_user(user_id: int, db=Depends(get_async_db, scope="function")):
     """Delete a user"""
-    user_service = UserService(db)
-    success = user_service.delete_user(user_id)
+    user_service = AsyncUserService(db)
+    success = await user_service.delete_user(user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User deleted successfully"}
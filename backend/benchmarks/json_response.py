@@ -0,0 +1,89 @@
+"""
+JSON response benchmark - response_model validation vs the fast path
+
+Serves the same page of posts through two routes, one returning dicts
+for FastAPI to validate against List[PostResponse] and one returning
+fast_json(), and reports the time per request for each page size.
+
+    python -m benchmarks.json_response [--requests N] [--sizes 50,500]
+"""
+
+import argparse
+import time
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.posts import PostResponse, post_body
+from api.responses import fast_json, orjson
+
+
+def _rows(count: int, expand_author: bool) -> List[dict]:
+    rows = []
+    for index in range(count, 0, -1):
+        row = {
+            "id": index,
+            "title": f"Post {index}",
+            "content": "Lorem ipsum dolor sit amet. " * 20,
+            "user_id": index % 50 + 1,
+            "created_at": "2024-01-01 00:00:00.000",
+            "version": 1,
+        }
+        if expand_author:
+            row["author"] = {
+                "id": row["user_id"],
+                "email": f"user{row['user_id']}@example.com",
+                "username": f"user{row['user_id']}",
+                "is_active": 1,
+                "version": 1,
+            }
+        rows.append(row)
+    return rows
+
+
+def _app(rows: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated", response_model=List[PostResponse], response_model_exclude_unset=True)
+    async def validated():
+        return rows
+
+    @app.get("/fast", response_model=List[PostResponse])
+    async def fast():
+        return fast_json([post_body(row) for row in rows])
+
+    return app
+
+
+def _time(client: TestClient, path: str, requests: int) -> float:
+    """Mean seconds per request after a short warm-up."""
+    for _ in range(min(requests, 20)):
+        client.get(path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path)
+    return (time.perf_counter() - start) / requests
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--sizes", default="50,500")
+    parser.add_argument("--expand-author", action="store_true")
+    args = parser.parse_args(argv)
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    for size in (int(part) for part in args.sizes.split(",")):
+        client = TestClient(_app(_rows(size, args.expand_author)))
+        assert client.get("/validated").json() == client.get("/fast").json()
+        validated = _time(client, "/validated", args.requests)
+        fast = _time(client, "/fast", args.requests)
+        print(
+            f"page={size:<4} validated={validated * 1e6:8.0f}us  fast={fast * 1e6:8.0f}us  "
+            f"saved={(validated - fast) * 1e6:7.0f}us/request ({1 - fast / validated:.0%})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Load test - drive the API in-process against a seeded SQLite database
+
+Seeds (or reuses) a database of the requested size, boots ``main.app``
+in this process and runs a weighted mix of the README routes at a fixed
+concurrency. Per-route throughput and p50/p95/p99 latencies are printed
+as JSON; with ``--baseline`` the run is compared against an earlier
+report and the exit status is 1 if a tracked metric got worse by more
+than ``--threshold``.
+
+    python -m benchmarks.load --users 10000 --posts 100000 --duration 30 \\
+        --output run.json [--baseline main.json --threshold 0.1]
+
+Needs httpx, which only this tool uses.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Every seeded user logs in with this password
+SEED_PASSWORD = "password"
+SEED_CHUNK_SIZE = 50_000
+
+# (name, weight); names double as report keys
+DEFAULT_MIX = (
+    ("list_posts", 25),
+    ("get_post", 20),
+    ("user_posts", 15),
+    ("get_user", 15),
+    ("list_users", 10),
+    ("login", 5),
+    ("create_post", 5),
+    ("update_post", 5),
+)
+
+# Regression checks: (metric, True if higher is worse)
+TRACKED = (("p95_ms", True), ("p99_ms", True), ("throughput_rps", False))
+
+_WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud"
+).split()
+
+
+def _seed_matches(path: Path, users: int, posts: int, seed: int) -> bool:
+    if not path.exists():
+        return False
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT users, posts, seed FROM benchmark_seed").fetchone()
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+    return row == (users, posts, seed)
+
+
+def seed_database(path: Path, users: int, posts: int, seed: int = 42, content_size: int = 400):
+    """Create a deterministic database of ``users`` users and ``posts`` posts.
+
+    A database already seeded with the same sizes and seed is reused, so
+    repeated runs start from identical data without paying for seeding.
+    """
+    if _seed_matches(path, users, posts, seed):
+        return
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+    from db.database import Database
+    from db.migrations import run_migrations
+    from services.passwords import get_password_hasher
+
+    db = Database(f"sqlite:///{path}")
+    run_migrations(db)
+    db.disconnect()
+
+    rng = random.Random(seed)
+    password = get_password_hasher().hash(SEED_PASSWORD)
+    epoch = 1_700_000_000
+
+    def stamp(offset: int) -> str:
+        return time.strftime("%Y-%m-%d %H:%M:%S.000", time.gmtime(epoch + offset))
+
+    def content() -> str:
+        words = []
+        length = 0
+        while length < content_size:
+            word = rng.choice(_WORDS)
+            words.append(word)
+            length += len(word) + 1
+        return " ".join(words)
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA synchronous = OFF")
+    try:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO users (email, username, password, created_at) VALUES (?, ?, ?, ?)",
+            ((f"user{n}@example.com", f"user{n}", password, stamp(n)) for n in range(1, users + 1))
+        )
+        conn.execute("COMMIT")
+        for start in range(0, posts, SEED_CHUNK_SIZE):
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO posts (title, content, user_id, created_at) VALUES (?, ?, ?, ?)",
+                (
+                    (f"Post {n}", content(), rng.randint(1, users), stamp(n))
+                    for n in range(start + 1, min(start + SEED_CHUNK_SIZE, posts) + 1)
+                )
+            )
+            conn.execute("COMMIT")
+        conn.execute("CREATE TABLE benchmark_seed (users INTEGER, posts INTEGER, seed INTEGER)")
+        conn.execute("INSERT INTO benchmark_seed VALUES (?, ?, ?)", (users, posts, seed))
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def _request(name: str, rng: random.Random, users: int, posts: int) -> Tuple[str, str, Optional[dict]]:
+    """(method, url, json body) for one request of scenario ``name``."""
+    user_id = rng.randint(1, users)
+    post_id = rng.randint(1, posts)
+    if name == "list_posts":
+        return "GET", "/api/posts/?limit=50", None
+    if name == "get_post":
+        return "GET", f"/api/posts/{post_id}", None
+    if name == "user_posts":
+        return "GET", f"/api/posts/user/{user_id}?limit=20", None
+    if name == "get_user":
+        return "GET", f"/api/users/{user_id}", None
+    if name == "list_users":
+        return "GET", f"/api/users/?limit=100&skip={rng.randint(0, max(users - 100, 0))}", None
+    if name == "login":
+        return "POST", "/api/auth/login", {"email": f"user{user_id}@example.com", "password": SEED_PASSWORD}
+    if name == "create_post":
+        return "POST", "/api/posts/", {"title": "Benchmark", "content": "x" * 200, "author_id": user_id}
+    if name == "update_post":
+        return "PUT", f"/api/posts/{post_id}", {"title": f"Edited {rng.random():.6f}"}
+    raise ValueError(f"Unknown scenario {name!r}")
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(fraction * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _summarise(latencies: List[float], errors: int, seconds: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": len(ordered) / seconds if seconds else 0.0,
+        "p50_ms": _percentile(ordered, 0.50) * 1000,
+        "p95_ms": _percentile(ordered, 0.95) * 1000,
+        "p99_ms": _percentile(ordered, 0.99) * 1000,
+    }
+
+
+async def run_load(
+    users: int,
+    posts: int,
+    concurrency: int = 16,
+    duration: float = 30.0,
+    warmup: float = 3.0,
+    seed: int = 42,
+    mix=DEFAULT_MIX,
+) -> dict:
+    """Drive ``main.app`` and return the report; DATABASE_URL must point at the seeded file."""
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError("The load test requires the 'httpx' package") from None
+    from main import app
+
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+
+    async def worker(client, index: int, measure_from: float, stop_at: float):
+        rng = random.Random(seed * 1000 + index)
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            name = rng.choices(names, weights)[0]
+            method, url, body = _request(name, rng, users, posts)
+            response = await client.request(method, url, json=body)
+            elapsed = time.perf_counter() - now
+            if now < measure_from:
+                continue
+            latencies[name].append(elapsed)
+            # 404s on random ids of deleted rows are not server faults
+            if response.status_code >= 500 or response.status_code in (400, 422):
+                errors[name] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            start = time.perf_counter()
+            measure_from = start + warmup
+            stop_at = measure_from + duration
+            await asyncio.gather(*(worker(client, index, measure_from, stop_at) for index in range(concurrency)))
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "users": users,
+            "posts": posts,
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "seed": seed,
+        },
+        "overall": _summarise(all_latencies, sum(errors.values()), duration),
+        "routes": {
+            name: _summarise(latencies[name], errors[name], duration)
+            for name in names
+            if latencies[name]
+        },
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """Tracked metrics that are more than ``threshold`` (a fraction) worse than ``baseline``."""
+    regressions = []
+    sections = [("overall", report["overall"], baseline.get("overall"))]
+    sections += [
+        (name, stats, baseline.get("routes", {}).get(name))
+        for name, stats in report["routes"].items()
+    ]
+    for name, current, previous in sections:
+        if not previous:
+            continue
+        for metric, higher_is_worse in TRACKED:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (change if higher_is_worse else -change) > threshold:
+                regressions.append(f"{name}.{metric}: {before:.2f} -> {after:.2f} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--database", type=Path, default=None,
+                        help="seeded database file (default: benchmark-<users>-<posts>.db)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--output", type=Path, help="also write the report here")
+    parser.add_argument("--baseline", type=Path, help="report of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed relative regression before failing (default 0.10)")
+    args = parser.parse_args(argv)
+
+    database = args.database or Path(f"benchmark-{args.users}-{args.posts}.db")
+    # The app's global database reads DATABASE_URL at import, so set it
+    # before seeding imports anything from db.
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}?pool_size={args.pool_size}"
+    seed_database(database, args.users, args.posts, args.seed)
+
+    report = asyncio.run(run_load(
+        args.users, args.posts, args.concurrency, args.duration, args.warmup, args.seed
+    ))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        settings = ("users", "posts", "concurrency", "duration_s")
+        if any(baseline["meta"].get(key) != report["meta"][key] for key in settings):
+            print(f"Baseline was run with different {', '.join(settings)}; not comparable", file=sys.stderr)
+            return 2
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Search benchmark - FTS5 index vs a LIKE scan
+
+Seeds (or reuses) the load test's database and times
+PostService.search_posts() against the ``LIKE '%term%'`` query it
+replaces, for a rare term, a common term and a two-word query. Reports
+the mean milliseconds per query for each as JSON.
+
+    python -m benchmarks.search [--users 10000 --posts 100000] [--repeat 20]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.load import seed_database
+
+# What search would be without the index: every word in title or content
+NAIVE_SEARCH_QUERY = (
+    "SELECT * FROM posts WHERE {conditions} ORDER BY created_at DESC, id DESC LIMIT :limit"
+)
+
+
+def naive_search(db, text: str, limit: int = 20) -> list:
+    words = text.split()
+    conditions = " AND ".join(
+        f"(title LIKE :w{index} OR content LIKE :w{index})" for index in range(len(words))
+    )
+    params = {f"w{index}": f"%{word}%" for index, word in enumerate(words)}
+    return db.fetch_all(NAIVE_SEARCH_QUERY.format(conditions=conditions), {**params, "limit": limit})
+
+
+def _time(fn: Callable[[], list], repeat: int) -> dict:
+    rows = fn()  # warm the page cache and statement cache first
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return {"mean_ms": (time.perf_counter() - start) * 1000 / repeat, "rows": len(rows)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--database", type=Path, default=None,
+                        help="seeded database file (default: benchmark-<users>-<posts>.db)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    database = args.database or Path(f"benchmark-{args.users}-{args.posts}.db")
+    seed_database(database, args.users, args.posts)
+
+    from db.database import Database
+    from db.migrations import run_migrations
+    from services.cache import MemoryCache
+    from services.post_service import PostService
+
+    db = Database(f"sqlite:///{database}")
+    # A database seeded before the index existed gets it built here.
+    run_migrations(db)
+    service = PostService(db, MemoryCache())
+
+    # Seeded titles are "Post <n>", so a title number occurs once.
+    queries = {
+        "rare": str(args.posts // 2),
+        "common": "tempor",
+        "two_words": "magna veniam",
+    }
+    report = {"meta": {"users": args.users, "posts": args.posts, "repeat": args.repeat}, "queries": {}}
+    for name, text in queries.items():
+        report["queries"][name] = {
+            "text": text,
+            "fts": _time(lambda: service.search_posts(text, limit=args.limit)[0], args.repeat),
+            "like": _time(lambda: naive_search(db, text, args.limit), args.repeat),
+        }
+    db.disconnect()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
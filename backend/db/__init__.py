@@ -3,5 +3,14 @@ Database module
 """
 
 from .database import get_db, Database
+from .async_database import get_async_db, get_async_engine, AsyncDatabase
+from .migrations import run_migrations
 
-__all__ = ["get_db", "Database"]
+__all__ = [
+    "get_db",
+    "Database",
+    "get_async_db",
+    "get_async_engine",
+    "AsyncDatabase",
+    "run_migrations",
+]
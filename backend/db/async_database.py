@@ -0,0 +1,186 @@
+"""
+Async Database Access
+"""
+
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncGenerator, AsyncIterator, Callable, Iterable, List, Optional, TypeVar
+
+from .database import Database, _db
+
+T = TypeVar("T")
+
+
+class _ConnectionPermits:
+    """One permit per pooled connection, awaited on the event loop.
+
+    Waiting for a connection inside an executor thread can deadlock: once
+    every thread is blocked in pool.acquire(), the sessions that hold the
+    connections have no thread left to finish on. Taking a permit first
+    means a thread only starts work it can get a connection for.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._loop = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def semaphore(self) -> asyncio.Semaphore:
+        # Semaphores belong to one loop; tests may run several in turn.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.size)
+        return self._semaphore
+
+
+class AsyncDatabase:
+    """Awaitable facade over Database that runs every query on a dedicated executor."""
+
+    def __init__(self, db: Database, executor: Optional[ThreadPoolExecutor] = None,
+                 permits: Optional[_ConnectionPermits] = None):
+        self.sync = db
+        self._executor = executor
+        self._permits = permits or _ConnectionPermits(db.pool_size)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """The query executor, sized to the connection pool."""
+        if self._executor is None:
+            # More threads than connections would only queue on the pool.
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.sync.pool_size, thread_name_prefix="db"
+            )
+        return self._executor
+
+    @property
+    def bound(self) -> bool:
+        """Whether this handle belongs to a session and already holds a connection."""
+        return self.sync._conn is not None
+
+    def unbound(self) -> "AsyncDatabase":
+        """A handle on the same pool and executor that is not tied to a session."""
+        if not self.bound:
+            return self
+        return AsyncDatabase(self.sync.unbound(), self.executor, self._permits)
+
+    async def _call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run a blocking callable on the database executor.
+
+        On an unbound handle ``fn`` may borrow one connection at a time;
+        a permit for it is awaited before a thread is used.
+        """
+        if self.bound:
+            return await self._call(fn, *args, **kwargs)
+        async with self._permits.semaphore():
+            return await self._call(fn, *args, **kwargs)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator["AsyncDatabase"]:
+        """Check out one pooled connection and yield an async handle bound to it."""
+        async with self._permits.semaphore():
+            context = self.sync.session()
+            db = await self._call(context.__enter__)
+            try:
+                yield AsyncDatabase(db, self.executor, self._permits)
+            except BaseException:
+                if not await self._call(context.__exit__, *sys.exc_info()):
+                    raise
+            else:
+                await self._call(context.__exit__, None, None, None)
+
+    @asynccontextmanager
+    async def savepoint(self) -> AsyncIterator["AsyncDatabase"]:
+        """Nest a group of writes that rolls back on its own if it raises."""
+        context = self.sync.savepoint()
+        await self.run(context.__enter__)
+        try:
+            yield self
+        except BaseException:
+            if not await self.run(context.__exit__, *sys.exc_info()):
+                raise
+        else:
+            await self.run(context.__exit__, None, None, None)
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether this session has uncommitted writes."""
+        return self.sync.in_transaction
+
+    async def execute(self, query: str, params: dict = None) -> dict:
+        """Execute a database query."""
+        return await self.run(self.sync.execute, query, params)
+
+    async def execute_many(self, query: str, params_seq: Iterable[dict]) -> List[dict]:
+        """Execute a query once per parameter set inside a single transaction."""
+        return await self.run(self.sync.execute_many, query, list(params_seq))
+
+    async def fetch_one(self, query: str, params: dict = None) -> Optional[dict]:
+        """Fetch a single row."""
+        return await self.run(self.sync.fetch_one, query, params)
+
+    async def fetch_all(self, query: str, params: dict = None, max_rows: Optional[int] = None) -> list:
+        """Fetch all rows, or at most ``max_rows`` of them."""
+        return await self.run(self.sync.fetch_all, query, params, max_rows)
+
+    async def fetch_iter(self, query: str, params: dict = None, chunk_size: int = 500) -> AsyncIterator[dict]:
+        """Yield rows one at a time while reading them from SQLite in chunks."""
+        if self.bound:
+            async for row in self._iter_rows(query, params, chunk_size):
+                yield row
+            return
+        # The connection stays checked out for the whole stream.
+        async with self._permits.semaphore():
+            async for row in self._iter_rows(query, params, chunk_size):
+                yield row
+
+    async def _iter_rows(self, query: str, params: dict, chunk_size: int) -> AsyncIterator[dict]:
+        chunks = self.sync._iter_chunks(query, params, chunk_size)
+        try:
+            while True:
+                rows = await self._call(next, chunks, None)
+                if rows is None:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            await self._call(chunks.close)
+
+    async def close(self):
+        """Shut down the executor and close the pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.sync.disconnect()
+
+
+# Global async database instance sharing the synchronous pool
+_async_db = AsyncDatabase(_db)
+
+
+def get_async_engine() -> AsyncDatabase:
+    """Dependency for work that outlives the request, such as streamed responses.
+
+    Queries on the returned handle borrow their own pooled connection instead
+    of the request's session.
+    """
+    return _async_db
+
+
+async def get_async_db() -> AsyncGenerator[AsyncDatabase, None]:
+    """Dependency injection for async database sessions.
+
+    Each request gets one unit of work that commits when the handler
+    returns and rolls back if it raises. Declare it with
+    ``Depends(get_async_db, scope="function")`` so the commit happens
+    before the response is sent.
+    """
+    async with _async_db.session() as db:
+        yield db
@@ -2,47 +2,520 @@
 Database Connection and Session Management
 """
 
-from typing import Generator
+import itertools
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Generator, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from metrics import observe_query
+from .query_log import QueryStats, fingerprint
+
+logger = logging.getLogger(__name__)
+
+_memory_ids = itertools.count(1)
+
+
+def parse_connection_string(connection_string: str) -> dict:
+    """Split a ``sqlite:///path?pool_size=N&timeout=S`` URL into pool settings.
+
+    ``slow_query_ms`` sets the threshold of the slow-query log.
+    """
+    parts = urlsplit(connection_string)
+    if parts.scheme != "sqlite":
+        raise ValueError(f"Unsupported database URL: {connection_string!r}")
+
+    options = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+    path = parts.path[1:] if parts.path.startswith("/") else parts.path
+    if path in ("", ":memory:"):
+        # Every pooled connection must see the same in-memory database.
+        path = f"file:memdb{next(_memory_ids)}?mode=memory&cache=shared"
+        uri = True
+    else:
+        uri = False
+
+    return {
+        "database": path,
+        "uri": uri,
+        "pool_size": int(options.get("pool_size", 5)),
+        "timeout": float(options.get("timeout", 30.0)),
+        "statement_cache_size": int(options.get("statement_cache_size", 128)),
+        # Negative disables the slow-query log
+        "slow_query_ms": float(options.get("slow_query_ms", 100.0)),
+    }
+
+
+def _control(conn: sqlite3.Connection, statement: str):
+    """Run a transaction-control statement without counting it as a prepared query."""
+    sqlite3.Connection.execute(conn, statement)
+
+
+class StatementCache:
+    """LRU of SQL texts prepared on one connection.
+
+    sqlite3 keeps its own per-connection cache of compiled statements keyed
+    by query text; this mirrors it with the same capacity so hits and misses
+    can be observed.
+    """
+
+    def __init__(self, size: int = 128):
+        self.size = size
+        self._queries: "OrderedDict[str, None]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def touch(self, query: str):
+        """Record that ``query`` is about to be executed."""
+        if query in self._queries:
+            self._queries.move_to_end(query)
+            self.hits += 1
+            return
+        self.misses += 1
+        if self.size <= 0:
+            return
+        self._queries[query] = None
+        if len(self._queries) > self.size:
+            self._queries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection that tracks its prepared-statement cache."""
+
+    def __init__(self, *args, cached_statements: int = 128, **kwargs):
+        super().__init__(*args, cached_statements=cached_statements, **kwargs)
+        self.statements = StatementCache(cached_statements)
+
+    def execute(self, sql: str, parameters=(), /) -> sqlite3.Cursor:
+        self.statements.touch(sql)
+        return super().execute(sql, parameters)
+
+
+class ConnectionPool:
+    """Bounded pool of reusable SQLite connections."""
+
+    def __init__(
+        self,
+        database: str,
+        size: int = 5,
+        timeout: float = 30.0,
+        uri: bool = False,
+        statement_cache_size: int = 128,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.uri = uri
+        self.statement_cache_size = statement_cache_size
+        self._idle: "queue.LifoQueue[PooledConnection]" = queue.LifoQueue()
+        self._connections: "set[PooledConnection]" = set()
+        self._retired = StatementCache(0)
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _open(self) -> PooledConnection:
+        """Open and configure a new connection."""
+        conn = sqlite3.connect(
+            self.database,
+            uri=self.uri,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            factory=PooledConnection,
+            cached_statements=self.statement_cache_size,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.executescript("PRAGMA foreign_keys = ON;")
+        if not self.uri:
+            conn.executescript("PRAGMA journal_mode = WAL; PRAGMA synchronous = NORMAL;")
+        with self._lock:
+            self._connections.add(conn)
+        return conn
+
+    def _discard(self, conn: PooledConnection):
+        conn.close()
+        with self._lock:
+            self._connections.discard(conn)
+            self._retired.hits += conn.statements.hits
+            self._retired.misses += conn.statements.misses
+            self._retired.evictions += conn.statements.evictions
+            self._opened -= 1
+
+    def acquire(self) -> PooledConnection:
+        """Check out an idle connection, opening one if the pool has room."""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No database connection available after {self.timeout}s"
+            ) from None
+
+    def release(self, conn: PooledConnection):
+        """Return a connection to the pool."""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Borrow a connection for the duration of a block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close idle connections; busy ones are closed when released."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def statement_cache_stats(self) -> dict:
+        """Aggregate prepared-statement cache counters across connections."""
+        with self._lock:
+            caches = [conn.statements for conn in self._connections]
+            hits, misses = self._retired.hits, self._retired.misses
+            evictions = self._retired.evictions
+        hits += sum(cache.hits for cache in caches)
+        misses += sum(cache.misses for cache in caches)
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions + sum(cache.evictions for cache in caches),
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "cached": sum(len(cache) for cache in caches),
+            "capacity_per_connection": self.statement_cache_size,
+        }
 
 
 class Database:
     """Simple database abstraction layer."""
 
-    def __init__(self, connection_string: str = "sqlite:///./app.db"):
+    def __init__(self, connection_string: str = "sqlite:///./app.db", pool_size: Optional[int] = None):
         self.connection_string = connection_string
-        self._connected = False
+        self._settings = parse_connection_string(connection_string)
+        if pool_size is not None:
+            self._settings["pool_size"] = pool_size
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        self.query_stats = QueryStats(self._settings["slow_query_ms"])
+        # Set on handles yielded by session(); unbound handles borrow per call.
+        self._conn: Optional[PooledConnection] = None
+
+    @property
+    def pool_size(self) -> int:
+        """Maximum number of pooled connections."""
+        return self._settings["pool_size"]
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """The connection pool, created on first use."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    pool = ConnectionPool(
+                        self._settings["database"],
+                        size=self._settings["pool_size"],
+                        timeout=self._settings["timeout"],
+                        uri=self._settings["uri"],
+                        statement_cache_size=self._settings["statement_cache_size"],
+                    )
+                    self._pool = pool
+        return self._pool
 
     def connect(self):
         """Establish database connection."""
-        self._connected = True
+        self.pool
         return self
 
     def disconnect(self):
         """Close database connection."""
-        self._connected = False
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
+    def statement_cache_stats(self) -> dict:
+        """Prepared-statement cache hit/miss counters for the pool."""
+        return self.pool.statement_cache_stats()
+
+    @contextmanager
+    def session(self) -> Iterator["Database"]:
+        """Check out one pooled connection as a unit of work.
+
+        Reads run in autocommit mode until the first write opens a
+        transaction. That transaction commits once when the block exits and
+        rolls back if the block raises; callbacks registered with
+        on_commit() run after the commit and are dropped on rollback.
+        """
+        pool = self.pool
+        conn = pool.acquire()
+        try:
+            handle = self._bind(conn)
+            yield handle
+            if conn.in_transaction:
+                _control(conn, "COMMIT")
+        finally:
+            # Rolls back anything left uncommitted.
+            pool.release(conn)
+        handle._run_on_commit()
+
+    def _bind(self, conn: PooledConnection) -> "Database":
+        handle = Database.__new__(Database)
+        handle.__dict__.update(self.__dict__)
+        handle._conn = conn
+        handle._savepoint_ids = itertools.count(1)
+        handle._on_commit = []
+        return handle
+
+    def unbound(self) -> "Database":
+        """A handle on the same pool that borrows a connection per call.
+
+        For work that outlives the session this handle belongs to.
+        """
+        if self._conn is None:
+            return self
+        handle = Database.__new__(Database)
+        handle.__dict__.update(self.__dict__)
+        handle._conn = None
+        del handle._savepoint_ids, handle._on_commit
+        return handle
+
+    def on_commit(self, callback: Callable[[], None]):
+        """Run ``callback`` once this handle's writes are committed.
+
+        Cache invalidation and similar side effects go through here, so a
+        concurrent reader cannot put back a row that is about to change.
+        With no transaction open the writes are already durable and the
+        callback runs at once.
+        """
+        if self.in_transaction:
+            self._on_commit.append(callback)
+        else:
+            callback()
+
+    def _run_on_commit(self):
+        callbacks, self._on_commit = self._on_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # The commit stands; one failed side effect must not hide it.
+                logger.exception("on_commit callback failed")
 
-    def execute(self, query: str, params: dict = None):
-        """Execute a database query."""
-        # Simulated execution
-        return {"query": query, "params": params}
+    @property
+    def in_transaction(self) -> bool:
+        """Whether this session has uncommitted writes."""
+        return self._conn is not None and self._conn.in_transaction
 
-    def fetch_one(self, query: str, params: dict = None):
+    def _begin(self, conn: PooledConnection):
+        # Sessions batch their writes into one transaction; unbound handles
+        # stay in autocommit mode.
+        if self._conn is not None and not conn.in_transaction:
+            _control(conn, "BEGIN IMMEDIATE")
+
+    @contextmanager
+    def savepoint(self) -> Iterator["Database"]:
+        """Nest a group of writes that rolls back on its own if it raises."""
+        if self._conn is None:
+            raise RuntimeError("savepoint() needs a handle from session()")
+        conn = self._conn
+        self._begin(conn)
+        name = f"sp_{next(self._savepoint_ids)}"
+        _control(conn, f"SAVEPOINT {name}")
+        pending = len(self._on_commit)
+        try:
+            yield self
+        except BaseException:
+            _control(conn, f"ROLLBACK TO {name}")
+            _control(conn, f"RELEASE {name}")
+            # Side effects of the undone writes must not run either.
+            del self._on_commit[pending:]
+            raise
+        _control(conn, f"RELEASE {name}")
+
+    @contextmanager
+    def _connection(self) -> Iterator[PooledConnection]:
+        if self._conn is not None:
+            yield self._conn
+        else:
+            with self.pool.connection() as conn:
+                yield conn
+
+    def execute(self, query: str, params: dict = None) -> dict:
+        """Execute a database query.
+
+        For a statement with a ``RETURNING`` clause the first row it
+        produced is included under ``"row"`` (None when no row matched), so
+        callers get the stored values without querying again.
+        """
+        with self._connection() as conn:
+            self._begin(conn)
+            start = time.perf_counter()
+            cursor = conn.execute(query, params or {})
+            if cursor.description is None:
+                result = {"rowcount": cursor.rowcount, "lastrowid": cursor.lastrowid}
+            else:
+                # Drain the statement so it completes before the counters are read.
+                rows = cursor.fetchall()
+                result = {
+                    "rowcount": cursor.rowcount,
+                    "lastrowid": cursor.lastrowid,
+                    "row": dict(rows[0]) if rows else None,
+                }
+            self._observe(query, params, time.perf_counter() - start, cursor.rowcount)
+        return result
+
+    def execute_many(self, query: str, params_seq: Iterable[dict]) -> List[dict]:
+        """Execute a query once per parameter set inside a single transaction.
+
+        On an unbound handle the batch commits on its own; inside a session
+        it joins the session's transaction and commits with it.
+
+        Returns one ``{"rowcount", "lastrowid"}`` per set. A set that breaks
+        a constraint gets ``{"error": message}`` instead and the others still
+        commit; the batch is then replayed with a savepoint around each row.
+        """
+        params_list = list(params_seq)
+        with self._connection() as conn:
+            self._begin(conn)
+            owns_transaction = not conn.in_transaction
+            if owns_transaction:
+                _control(conn, "BEGIN IMMEDIATE")
+            start = time.perf_counter()
+            try:
+                _control(conn, "SAVEPOINT execute_many")
+                try:
+                    results = []
+                    for params in params_list:
+                        cursor = conn.execute(query, params)
+                        results.append({"rowcount": cursor.rowcount, "lastrowid": cursor.lastrowid})
+                    _control(conn, "RELEASE execute_many")
+                except sqlite3.IntegrityError:
+                    _control(conn, "ROLLBACK TO execute_many")
+                    _control(conn, "RELEASE execute_many")
+                    results = [self._execute_isolated(conn, query, params) for params in params_list]
+                if owns_transaction:
+                    _control(conn, "COMMIT")
+            except BaseException:
+                if owns_transaction and conn.in_transaction:
+                    _control(conn, "ROLLBACK")
+                raise
+            # One observation per batch; the rows are the sets that succeeded.
+            self._observe(
+                query, params_list[0] if params_list else None, time.perf_counter() - start,
+                sum(result.get("rowcount", 0) for result in results),
+            )
+        return results
+
+    @staticmethod
+    def _execute_isolated(conn: PooledConnection, query: str, params: dict) -> dict:
+        _control(conn, "SAVEPOINT execute_many_row")
+        try:
+            cursor = conn.execute(query, params)
+        except sqlite3.IntegrityError as exc:
+            _control(conn, "ROLLBACK TO execute_many_row")
+            _control(conn, "RELEASE execute_many_row")
+            return {"error": str(exc)}
+        _control(conn, "RELEASE execute_many_row")
+        return {"rowcount": cursor.rowcount, "lastrowid": cursor.lastrowid}
+
+    def _observe(self, query: str, params, seconds: float, rows: int):
+        """Feed one statement's timing to the query stats and the metrics."""
+        text = fingerprint(query)
+        self.query_stats.record(text, params, seconds, rows)
+        observe_query(text, seconds, rows)
+
+    def fetch_one(self, query: str, params: dict = None) -> Optional[dict]:
         """Fetch a single row."""
-        return None
+        with self._connection() as conn:
+            start = time.perf_counter()
+            row = conn.execute(query, params or {}).fetchone()
+            self._observe(query, params, time.perf_counter() - start, 0 if row is None else 1)
+        return dict(row) if row is not None else None
+
+    def fetch_all(self, query: str, params: dict = None, max_rows: Optional[int] = None) -> list:
+        """Fetch all rows, or at most ``max_rows`` of them."""
+        with self._connection() as conn:
+            start = time.perf_counter()
+            cursor = conn.execute(query, params or {})
+            rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+            self._observe(query, params, time.perf_counter() - start, len(rows))
+        return [dict(row) for row in rows]
 
-    def fetch_all(self, query: str, params: dict = None):
-        """Fetch all rows."""
-        return []
+    def fetch_iter(self, query: str, params: dict = None, chunk_size: int = 500) -> Iterator[dict]:
+        """Yield rows one at a time while reading them in chunks.
+
+        The connection stays checked out until the generator is exhausted or
+        closed, so only ``chunk_size`` rows are held in memory at once.
+        """
+        for rows in self._iter_chunks(query, params, chunk_size):
+            yield from rows
+
+    def _iter_chunks(self, query: str, params: dict = None, chunk_size: int = 500) -> Iterator[list]:
+        """Yield result rows in lists of at most ``chunk_size``."""
+        with self._connection() as conn:
+            cursor = conn.execute(query, params or {})
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield [dict(row) for row in rows]
+            finally:
+                cursor.close()
 
 
 # Global database instance
-_db = Database()
+_db = Database(os.environ.get("DATABASE_URL", "sqlite:///./app.db"))
 
 
 def get_db() -> Generator[Database, None, None]:
-    """Dependency injection for database sessions."""
-    try:
-        _db.connect()
-        yield _db
-    finally:
-        _db.disconnect()
+    """Dependency injection for database sessions.
+
+    Writes made through the yielded handle commit together when the request
+    finishes, or roll back if it fails.
+    """
+    with _db.session() as db:
+        yield db
@@ -0,0 +1,125 @@
+"""
+Query Plan Report
+
+Usage: python -m db.explain [--database URL] [--fail-on-scan]
+
+Runs EXPLAIN QUERY PLAN for every SQL string literal in services/, plus the
+UPDATE statements generated for partial updates, against a migrated
+database and flags full table scans and OFFSET scans.
+"""
+
+import argparse
+import ast
+import itertools
+import re
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .database import Database
+from .migrations import run_migrations
+
+SERVICES_DIR = Path(__file__).resolve().parent.parent / "services"
+
+# Services write SQL keywords in upper case.
+_SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\s")
+_PARAM = re.compile(r"(?<!:):(\w+)")
+# "SCAN posts" reads the whole table; "SCAN posts USING INDEX ..." walks an
+# index, and virtual tables such as json_each are expected to be scanned.
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+# Module constants whose queries read every row on purpose (streamed exports)
+EXPECTED_SCANS = {"EXPORT_USERS_QUERY", "EXPORT_POSTS_QUERY"}
+
+
+def find_queries(directory: Path = SERVICES_DIR) -> Iterator[Tuple[str, int, str, Optional[str]]]:
+    """Yield (file, line, sql, constant name) for every SQL literal under ``directory``."""
+    for path in sorted(directory.glob("*.py")):
+        tree = ast.parse(path.read_text(), filename=str(path))
+        names = {}
+        # Docstrings and bare string statements are prose, and f-string
+        # pieces are incomplete; generated_queries() covers the f-strings.
+        skipped = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1:
+                target = node.targets[0]
+                if isinstance(target, ast.Name) and isinstance(node.value, ast.Constant):
+                    names[id(node.value)] = target.id
+            elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+                skipped.add(id(node.value))
+            elif isinstance(node, ast.JoinedStr):
+                skipped.update(id(value) for value in node.values)
+        found = [
+            node for node in ast.walk(tree)
+            if isinstance(node, ast.Constant)
+            and isinstance(node.value, str)
+            and id(node) not in skipped
+            and _SQL_START.match(node.value)
+        ]
+        for node in sorted(found, key=lambda node: node.lineno):
+            yield path.name, node.lineno, " ".join(node.value.split()), names.get(id(node))
+
+
+def generated_queries() -> Iterator[Tuple[str, int, str, Optional[str]]]:
+    """Yield the partial UPDATE for every combination of updatable columns."""
+    from services.post_service import UPDATABLE_POST_FIELDS
+    from services.updates import update_statement
+    from services.user_service import UPDATABLE_USER_FIELDS
+
+    line = update_statement.__wrapped__.__code__.co_firstlineno
+    for table, fields in (("users", UPDATABLE_USER_FIELDS), ("posts", UPDATABLE_POST_FIELDS)):
+        for count in range(1, len(fields) + 1):
+            for columns in itertools.combinations(fields, count):
+                yield "updates.py", line, update_statement(table, columns), None
+
+
+def explain(db: Database, query: str) -> List[str]:
+    """Return the plan steps SQLite chooses for ``query``."""
+    params = {name: None for name in _PARAM.findall(query)}
+    rows = db.fetch_all(f"EXPLAIN QUERY PLAN {query}", params)
+    return [row["detail"] for row in rows]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database", default="sqlite:///:memory:",
+                        help="database URL to plan against (default: fresh in-memory schema)")
+    parser.add_argument("--fail-on-scan", action="store_true",
+                        help="exit non-zero if any query scans a whole table, scans past an OFFSET "
+                             "or cannot be planned")
+    args = parser.parse_args(argv)
+
+    db = Database(args.database)
+    run_migrations(db)
+    full_scans = offset_scans = unplanned = 0
+    for filename, line, query, name in itertools.chain(find_queries(), generated_queries()):
+        print(f"{filename}:{line}: {query}")
+        try:
+            steps = explain(db, query)
+        except Exception as exc:
+            print(f"    ! could not plan: {exc}")
+            unplanned += 1
+            continue
+        for step in steps:
+            flag = ""
+            if " OFFSET " in query and step.startswith("SCAN "):
+                # Rows before the offset are still read, so cost grows with it.
+                flag = "  <-- OFFSET scan"
+                offset_scans += 1
+            elif _FULL_SCAN.match(step):
+                if name in EXPECTED_SCANS:
+                    flag = "  (full scan, expected)"
+                elif " LIMIT " in query:
+                    flag = "  (scan stops at LIMIT)"
+                else:
+                    flag = "  <-- full scan"
+                    full_scans += 1
+            print(f"    {step}{flag}")
+    db.disconnect()
+
+    print(f"\n{full_scans} full table scan(s), {offset_scans} OFFSET scan(s), {unplanned} unplanned query(ies)")
+    return 1 if args.fail_on_scan and (full_scans or offset_scans or unplanned) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
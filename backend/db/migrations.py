@@ -0,0 +1,134 @@
+"""
+Schema Migrations
+"""
+
+from typing import List, Tuple
+
+from .database import Database, _control, _db
+
+# (version, name, statements); append new entries, never edit applied ones
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "create users and posts", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL,
+            is_active INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        )
+        """,
+    ]),
+    (2, "index lookups and listing orders", [
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_users_email ON users (email)",
+        # Trailing id matches the (created_at, id) keyset order of the listings.
+        "CREATE INDEX IF NOT EXISTS ix_posts_user_id_created_at ON posts (user_id, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS ix_posts_created_at ON posts (created_at, id)",
+    ]),
+    (3, "row versions for ETags", [
+        # Bumped by every update; read routes derive their ETags from it.
+        "ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE posts ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+    ]),
+    (4, "full-text index over posts", [
+        # External content: the index stores only tokens and reads the text
+        # back from posts, which the triggers keep it in step with.
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5 (
+            title, content,
+            content = 'posts', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+        """,
+        # Index the posts written before this migration.
+        "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')",
+    ]),
+    (5, "reindex posts only when their text changes", [
+        # An update that also sets an unchanged content must not re-tokenise it.
+        "DROP TRIGGER IF EXISTS posts_fts_update",
+        """
+        CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, content ON posts
+        WHEN old.title IS NOT new.title OR old.content IS NOT new.content BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, content)
+            VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+        """,
+    ]),
+    (6, "strip search match markers from stored posts", [
+        # Search snippets mark matches with char(2) and char(3).
+        """
+        UPDATE posts SET
+            title = replace(replace(title, char(2), ''), char(3), ''),
+            content = replace(replace(content, char(2), ''), char(3), '')
+        WHERE instr(title, char(2)) OR instr(title, char(3))
+            OR instr(content, char(2)) OR instr(content, char(3))
+        """,
+    ]),
+]
+
+
+def run_migrations(db: Database = _db) -> List[int]:
+    """Apply pending migrations in order and return the versions applied.
+
+    Safe to call from every worker at startup: BEGIN IMMEDIATE serialises
+    concurrent runners, and applied versions are recorded in
+    schema_migrations.
+    """
+    applied = []
+    with db.pool.connection() as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+            "applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+        )
+        _control(conn, "BEGIN IMMEDIATE")
+        try:
+            done = {row["version"] for row in conn.execute("SELECT version FROM schema_migrations")}
+            for version, name, statements in MIGRATIONS:
+                if version in done:
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (:version, :name)",
+                    {"version": version, "name": name}
+                )
+                applied.append(version)
+            _control(conn, "COMMIT")
+        except BaseException:
+            _control(conn, "ROLLBACK")
+            raise
+    return applied
+
+
+if __name__ == "__main__":
+    print(f"Applied migrations: {run_migrations() or 'none'}")
@@ -0,0 +1,112 @@
+"""
+Query Log - per-fingerprint statistics and a slow-query log
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from functools import lru_cache
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w:])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*(?:\?|:\w+)(?:\s*,\s*(?:\?|:\w+))*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+# Fingerprints tracked before new ones are folded into one bucket
+MAX_FINGERPRINTS = 1000
+_OVERFLOW = "<other queries>"
+
+SORT_KEYS = ("total_ms", "calls", "max_ms", "mean_ms", "rows")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(query: str) -> str:
+    """Reduce a statement to its shape: literals become ``?``, whitespace collapses.
+
+    Named ``:param`` placeholders are kept, so the services' queries are
+    their own fingerprints; inline literals and IN lists of any length
+    collapse onto one entry.
+    """
+    text = _STRING.sub("?", query)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("IN (...)", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def fingerprint_id(text: str) -> str:
+    """Short stable id for a fingerprint, handy in logs and dashboards."""
+    return hashlib.blake2b(text.encode(), digest_size=6).hexdigest()
+
+
+def redact(params) -> Optional[object]:
+    """Replace parameter values with their type names."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+class QueryStats:
+    """Call count, time and rows per query fingerprint.
+
+    Statements slower than ``slow_query_ms`` are logged as warnings with
+    their parameters redacted to type names.
+    """
+
+    def __init__(self, slow_query_ms: float = 100.0, max_fingerprints: int = MAX_FINGERPRINTS):
+        self.slow_query_ms = slow_query_ms
+        self.max_fingerprints = max_fingerprints
+        # fingerprint -> [calls, total seconds, max seconds, rows]
+        self._entries: dict = {}
+        self._lock = threading.Lock()
+
+    def record(self, text: str, params, seconds: float, rows: int):
+        """Add one execution of the statement fingerprinted as ``text``."""
+        with self._lock:
+            entry = self._entries.get(text)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    text = _OVERFLOW
+                    entry = self._entries.get(text)
+                if entry is None:
+                    entry = self._entries[text] = [0, 0.0, 0.0, 0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3] += max(rows, 0)
+
+        if self.slow_query_ms >= 0 and seconds * 1000 >= self.slow_query_ms:
+            logger.warning(
+                "Slow query %.1fms [%s] %s params=%s",
+                seconds * 1000, fingerprint_id(text), text, redact(params),
+            )
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> List[dict]:
+        """The ``limit`` heaviest fingerprints by ``sort`` (one of SORT_KEYS)."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        with self._lock:
+            entries = [(text, list(entry)) for text, entry in self._entries.items()]
+        rows = [
+            {
+                "id": fingerprint_id(text),
+                "fingerprint": text,
+                "calls": calls,
+                "total_ms": total * 1000,
+                "mean_ms": total * 1000 / calls,
+                "max_ms": longest * 1000,
+                "rows": row_count,
+            }
+            for text, (calls, total, longest, row_count) in entries
+        ]
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
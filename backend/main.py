@@ -3,17 +3,40 @@ FastAPI Backend Server
 User Management API
 """
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from api.users import router as users_router
 from api.posts import router as posts_router
 from api.auth import router as auth_router
+from api.admin import router as admin_router
+from db.async_database import _async_db
+from db.migrations import run_migrations
+from metrics import MetricsMiddleware, registry
+from services.cache import get_cache
+from warmup import warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Migrate and warm up before serving; release the pool on exit."""
+    app.state.ready = False
+    run_migrations(_async_db.sync)
+    warm_up(_async_db.sync)
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    await _async_db.close()
+
 
 app = FastAPI(
     title="User Management API",
     description="API for managing users and posts",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -23,12 +46,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Has-More", "X-Total-Count", "ETag"],
 )
 
+# Outermost, so the timings include CORS handling
+app.add_middleware(MetricsMiddleware)
+
+
+def _runtime_gauges():
+    """Cache and connection pool state, read when /metrics is scraped."""
+    cache = get_cache().stats()
+    yield "cache_hits", "Cache lookups that found an entry.", cache["hits"]
+    yield "cache_misses", "Cache lookups that missed.", cache["misses"]
+    statements = _async_db.sync.statement_cache_stats()
+    yield "db_statement_cache_hits", "Prepared statements reused.", statements["hits"]
+    yield "db_statement_cache_misses", "Statements that had to be prepared.", statements["misses"]
+    yield "db_pool_size", "Connections the pool may open.", _async_db.sync.pool_size
+
+
+registry.add_collector(_runtime_gauges)
+
 # Include routers
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
 app.include_router(users_router, prefix="/api/users", tags=["users"])
 app.include_router(posts_router, prefix="/api/posts", tags=["posts"])
+app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
 
 
 @app.get("/api/health")
@@ -37,6 +79,21 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness endpoint; 503 until this worker has warmed up"""
+    if not getattr(app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
+    # Single process for development; serve.py runs one worker per core.
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,219 @@
+"""
+Metrics - request and query instrumentation in Prometheus text format
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Seconds; spans a cached lookup up to a slow export
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Sharded:
+    """Per-thread storage, so recording never takes a lock.
+
+    Each thread writes only to its own shard; the lock is held only when a
+    thread records for the first time and when a scrape merges shards.
+    Counts are per process, so each worker reports its own series.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...]):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> List[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        # Copy before iterating; the owning threads keep writing.
+        return [dict(shard) for shard in shards]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, Tuple[str, ...], float]]:
+        totals: Dict[tuple, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        for labels, value in sorted(totals.items()):
+            yield self.name, labels, value
+
+
+class Gauge(Counter):
+    """Counter that may go down, e.g. requests in flight."""
+
+    kind = "gauge"
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = buckets
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # Per-bucket counts (last one is +Inf), then sum
+            entry = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def samples(self) -> Iterable[Tuple[str, Tuple[str, ...], float]]:
+        merged: Dict[tuple, list] = {}
+        for shard in self._snapshot():
+            for labels, entry in shard.items():
+                total = merged.setdefault(labels, [0] * len(entry))
+                for index, value in enumerate(entry):
+                    total[index] += value
+        for labels, entry in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry[:-1]):
+                cumulative += count
+                yield self.name + "_bucket", labels + (_format_bound(bound),), cumulative
+            yield self.name + "_sum", labels, entry[-1]
+            yield self.name + "_count", labels, cumulative
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    """Metrics plus callbacks that report gauges read at scrape time."""
+
+    def __init__(self):
+        self.metrics: List[_Sharded] = []
+        self.collectors: List[Callable[[], Iterable[Tuple[str, str, float]]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, float]]]):
+        """``collector`` yields (name, help, value) gauges when scraped."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                names = metric.labelnames + (("le",) if name.endswith("_bucket") else ())
+                if labels:
+                    pairs = ",".join(f'{key}="{_escape(str(val))}"' for key, val in zip(names, labels))
+                    lines.append(f"{name}{{{pairs}}} {value}")
+                else:
+                    lines.append(f"{name} {value}")
+        for collector in self.collectors:
+            for name, help_text, value in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP responses by route and status code.", ("method", "route", "status")
+))
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to complete HTTP requests.", ("method", "route")
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being handled.", ()
+))
+db_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "Time spent in SQL statements by fingerprint.", ("query",)
+))
+db_rows = registry.register(Counter(
+    "db_query_rows_total", "Rows returned or affected by SQL statements by fingerprint.", ("query",)
+))
+
+
+def observe_query(fingerprint: str, seconds: float, rows: int):
+    """Record one statement under its fingerprint."""
+    labels = (fingerprint,)
+    db_duration.observe(labels, seconds)
+    if rows > 0:
+        db_rows.inc(labels, rows)
+
+
+def _route_template(scope) -> str:
+    """The matched route's path template, e.g. /api/users/{user_id}."""
+    route = scope.get("route")
+    if route is None:
+        return "<unmatched>"
+    # Newer FastAPI resolves included routers lazily: scope["route"] is then
+    # the router's own route without the include prefix, and the full
+    # template is on the effective route context. Older releases copy the
+    # prefix into the included route itself.
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(context, "path_format", None) or route.path
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request by its route template.
+
+    Requests that match no route are grouped under one label, so probing
+    random paths cannot grow the series without bound.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            method = scope["method"]
+            route = _route_template(scope)
+            http_duration.observe((method, route), time.perf_counter() - start)
+            http_requests.inc((method, route, str(status)))
@@ -0,0 +1,287 @@
+"""
+Serve - production entry point running the API in several worker processes
+
+The master imports the app once, brings the schema up to date, binds the
+listening socket and forks ``--workers`` children that share it. Each
+worker warms its own pool and cache in the app's lifespan and reports
+back once it is accepting connections.
+
+    python serve.py --workers 4 --port 8000
+
+Signals to the master:
+    TERM, INT   stop every worker gracefully, then exit
+    HUP         rolling restart: each worker is replaced only after its
+                successor is ready, so capacity never drops
+
+Workers that die are replaced, with a growing delay between attempts
+while replacements fail to start. The app is preloaded, so code changes
+still need a full restart.
+"""
+
+import argparse
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from db.database import _db
+from db.migrations import run_migrations
+from main import app
+
+logger = logging.getLogger("serve")
+
+# Byte a worker writes to its pipe once it is accepting connections
+_READY = b"1"
+
+# Seconds between attempts to replace a dead worker, doubling per failure
+SPAWN_BACKOFF_MIN = 1.0
+SPAWN_BACKOFF_MAX = 60.0
+
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn server that tells the master when startup (and warm-up) is done."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if not self.should_exit:
+            os.write(self.ready_fd, _READY)
+        os.close(self.ready_fd)
+
+
+class Master:
+    """Forks, supervises and restarts the worker processes."""
+
+    def __init__(self, sock: socket.socket, workers: int, graceful_timeout: float, ready_timeout: float):
+        self.sock = sock
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.retiring: Dict[int, float] = {}  # pid -> when to kill it
+        self.restart_queue: List[int] = []  # workers a rolling restart has yet to replace
+        self.missing = 0  # dead workers not replaced yet
+        self.retry_at = 0.0
+        self.backoff = SPAWN_BACKOFF_MIN
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self) -> Optional[int]:
+        """Fork one worker and wait until it is ready; None if it failed to start."""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            self._run_worker(write_fd)
+        os.close(write_fd)
+        self.children[pid] = time.monotonic()
+        try:
+            ready, _, _ = select.select([read_fd], [], [], self.ready_timeout)
+            started = bool(ready) and os.read(read_fd, 1) == _READY
+        finally:
+            os.close(read_fd)
+        if not started:
+            logger.error("Worker %d did not become ready", pid)
+            self.stop([pid], graceful=False)
+            return None
+        logger.info("Worker %d ready", pid)
+        return pid
+
+    def _run_worker(self, ready_fd: int):
+        """Child side of spawn(); never returns."""
+        code = 1
+        try:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, signal.SIG_DFL)
+            # Only the master acts on HUP.
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            config = uvicorn.Config(
+                app,
+                lifespan="on",
+                timeout_graceful_shutdown=self.graceful_timeout,
+            )
+            _WorkerServer(config, ready_fd).run(sockets=[self.sock])
+            code = 0
+        except SystemExit as exc:
+            code = exc.code if isinstance(exc.code, int) else 1
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+        finally:
+            os._exit(code)
+
+    def stop(self, pids, graceful: bool = True):
+        """Stop ``pids``, killing any still running after the graceful timeout."""
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM if graceful else signal.SIGKILL)
+        deadline = time.monotonic() + (self.graceful_timeout if graceful else 5)
+        remaining = set(pids)
+        while remaining:
+            for pid in list(remaining):
+                if self._reap(pid):
+                    remaining.discard(pid)
+            if not remaining:
+                break
+            if time.monotonic() >= deadline:
+                for pid in remaining:
+                    logger.warning("Worker %d did not stop in time; killing it", pid)
+                    self._signal(pid, signal.SIGKILL)
+                deadline = float("inf")
+            time.sleep(0.05)
+
+    def _signal(self, pid: int, sig: int):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self, pid: int) -> bool:
+        """Collect ``pid`` if it has exited."""
+        try:
+            done, _ = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            done = pid
+        if done:
+            self.children.pop(pid, None)
+        return bool(done)
+
+    def _reap_any(self):
+        """Collect exited workers; dead ones are counted for replacement."""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.children.pop(pid, None) is None:
+                continue
+            if self.retiring.pop(pid, None) is not None:
+                logger.info("Worker %d stopped", pid)
+                continue
+            logger.warning("Worker %d exited (%s); replacing it", pid, _describe(status))
+            if pid in self.restart_queue:
+                self.restart_queue.remove(pid)
+            if not self.stopping:
+                self.missing += 1
+
+    def _replace_missing(self):
+        """Start replacements for dead workers, backing off while they fail."""
+        while self.missing and not self.stopping and time.monotonic() >= self.retry_at:
+            if self.spawn() is None:
+                logger.warning("Retrying worker start in %.0fs", self.backoff)
+                self.retry_at = time.monotonic() + self.backoff
+                self.backoff = min(self.backoff * 2, SPAWN_BACKOFF_MAX)
+                return
+            self.missing -= 1
+            self.backoff = SPAWN_BACKOFF_MIN
+
+    def _retire(self, pid: int):
+        """Ask ``pid`` to finish its requests and exit; _reap_any() collects it."""
+        self._signal(pid, signal.SIGTERM)
+        self.retiring[pid] = time.monotonic() + self.graceful_timeout
+
+    def _kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now >= deadline:
+                logger.warning("Worker %d did not stop in time; killing it", pid)
+                self._signal(pid, signal.SIGKILL)
+                self.retiring[pid] = float("inf")
+
+    def _restart_next(self):
+        """Replace one worker of a rolling restart.
+
+        One per loop, so crashed workers keep being reaped and replaced
+        while the restart is under way.
+        """
+        if not self.restart_queue or self.missing:
+            return
+        old = self.restart_queue.pop(0)
+        if self.spawn() is None:
+            logger.error("Rolling restart aborted; keeping the remaining workers")
+            self.restart_queue.clear()
+            return
+        self._retire(old)
+        if not self.restart_queue:
+            logger.info("Rolling restart complete")
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        for _ in range(self.workers):
+            if self.spawn() is None:
+                # A worker that cannot boot now will not boot on retry either.
+                self.stop(list(self.children))
+                return 1
+        logger.info("Serving with %d workers", len(self.children))
+
+        while not self.stopping:
+            if self.reloading:
+                self.reloading = False
+                self.restart_queue = [pid for pid in self.children if pid not in self.retiring]
+            self._reap_any()
+            self._kill_overdue()
+            self._replace_missing()
+            self._restart_next()
+            time.sleep(0.5)
+
+        logger.info("Shutting down %d workers", len(self.children))
+        self.stop(list(self.children))
+        return 0
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def _handle_reload(self, signum, frame):
+        self.reloading = True
+
+
+def _describe(status: int) -> str:
+    if os.WIFSIGNALED(status):
+        return f"signal {signal.Signals(os.WTERMSIG(status)).name}"
+    return f"exit code {os.WEXITSTATUS(status)}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="seconds a worker gets to finish in-flight requests")
+    parser.add_argument("--ready-timeout", type=float, default=60.0,
+                        help="seconds a new worker gets to warm up before it is killed")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s")
+    if not hasattr(os, "fork"):
+        print("serve.py needs os.fork; run main.py for a single process instead", file=sys.stderr)
+        return 2
+
+    # Migrate before forking, so each worker's own run_migrations() in the
+    # app's lifespan finds nothing left to apply, and close the pool so no
+    # SQLite connection is shared across the fork.
+    run_migrations(_db)
+    _db.disconnect()
+
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    sock.set_inheritable(True)
+    try:
+        return Master(sock, max(args.workers, 1), args.graceful_timeout, args.ready_timeout).run()
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,15 @@
 Business Logic Services
 """
 
-from .user_service import UserService
-from .post_service import PostService
-from .auth_service import AuthService
+from .user_service import UserService, AsyncUserService
+from .post_service import PostService, AsyncPostService
+from .auth_service import AuthService, AsyncAuthService
 
-__all__ = ["UserService", "PostService", "AuthService"]
+__all__ = [
+    "UserService",
+    "PostService",
+    "AuthService",
+    "AsyncUserService",
+    "AsyncPostService",
+    "AsyncAuthService",
+]
@@ -2,50 +2,135 @@
 Auth Service - Authentication and authorization logic
 """
 
-from typing import Optional
+import asyncio
+import logging
+from functools import partial
+from typing import List, Optional, Set
 from db.database import Database
+from db.async_database import AsyncDatabase
+from .passwords import PasswordHasher, PasswordHasherBusy, get_password_hasher
+from .tokens import create_token, decode_token
+from .cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+# Compare-and-swap so a concurrent password change is never overwritten
+REHASH_QUERY = "UPDATE users SET password = :new WHERE id = :id AND password = :old"
+
+# Background rehash tasks, referenced until they finish
+_rehash_tasks: Set[asyncio.Task] = set()
 
 
 class AuthService:
     """Service for authentication operations."""
 
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, hasher: Optional[PasswordHasher] = None):
         self.db = db
+        self.hasher = hasher if hasher is not None else get_password_hasher()
 
     def authenticate(self, email: str, password: str) -> Optional[dict]:
         """Authenticate user with email and password."""
-        user = self.db.fetch_one(
+        user = self._find_user(email)
+        if user and self._verify_password(password, user.get("password", "")):
+            if self.hasher.needs_rehash(user["password"]):
+                self.rehash_password(user, self.hash_password(password))
+            return self.token_response(user)
+        return None
+
+    def rehash_password(self, user: dict, new_hash: str) -> bool:
+        """Replace a user's stored hash if it has not changed since it was read."""
+        result = self.db.execute(
+            REHASH_QUERY,
+            {"new": new_hash, "id": user["id"], "old": user["password"]}
+        )
+        self.db.on_commit(partial(get_cache().delete, f"user:{user['id']}"))
+        return result["rowcount"] == 1
+
+    def _find_user(self, email: str) -> Optional[dict]:
+        return self.db.fetch_one(
             "SELECT * FROM users WHERE email = :email",
             {"email": email}
         )
 
-        if user and self._verify_password(password, user.get("password", "")):
-            token = self.generate_token(user["id"])
-            return {
-                "access_token": token,
-                "token_type": "bearer",
-                "user_id": user["id"]
-            }
-        return None
+    def token_response(self, user: dict) -> dict:
+        """Build the login/register response for an authenticated user."""
+        token = self.generate_token(user["id"], email=user["email"], username=user["username"])
+        return {
+            "access_token": token,
+            "token_type": "bearer",
+            "user_id": user["id"]
+        }
 
-    def generate_token(self, user_id: int) -> str:
-        """Generate JWT token for user."""
-        # Simplified token generation
-        return f"jwt_token_{user_id}"
+    def generate_token(self, user_id: int, email: Optional[str] = None,
+                       username: Optional[str] = None) -> str:
+        """Generate JWT token for user.
+
+        The email and username ride along as claims so requests can identify
+        the user without reading the users table.
+        """
+        return create_token(user_id, {"email": email, "username": username})
 
     def verify_token(self, token: str) -> Optional[dict]:
-        """Verify and decode JWT token."""
-        if token.startswith("jwt_token_"):
-            user_id = int(token.split("_")[-1])
-            return {"user_id": user_id}
-        return None
+        """Verify and decode JWT token without touching the database."""
+        return decode_token(token)
 
     def _verify_password(self, plain: str, hashed: str) -> bool:
         """Verify password against hash."""
-        # Simplified - in production use bcrypt
-        return plain == hashed
+        return self.hasher.verify(plain, hashed)
 
     def hash_password(self, password: str) -> str:
         """Hash password for storage."""
-        # Simplified - in production use bcrypt
-        return password
+        return self.hasher.hash(password)
+
+
+class AsyncAuthService:
+    """Awaitable AuthService.
+
+    Queries run on the database executor and password hashing on the
+    hasher's own pool, so neither blocks the event loop or the other.
+    Hashing raises PasswordHasherBusy when the hasher's queue is full.
+    """
+
+    def __init__(self, db: AsyncDatabase, hasher: Optional[PasswordHasher] = None):
+        self.db = db
+        self._service = AuthService(db.sync, hasher)
+        self.hasher = self._service.hasher
+
+    async def authenticate(self, email: str, password: str) -> Optional[dict]:
+        user = await self.db.run(self._service._find_user, email)
+        if user and await self.hasher.verify_async(password, user.get("password", "")):
+            if self.hasher.needs_rehash(user["password"]):
+                task = asyncio.create_task(self._rehash(user, password))
+                _rehash_tasks.add(task)
+                task.add_done_callback(_rehash_tasks.discard)
+            return self._service.token_response(user)
+        return None
+
+    async def _rehash(self, user: dict, password: str):
+        """Upgrade a stored hash to the current cost after the login response.
+
+        Runs outside the request, on its own connection; a busy hasher or a
+        failure just leaves the old hash for the next login to upgrade.
+        """
+        try:
+            new_hash = await self.hasher.hash_async(password)
+            engine = self.db.unbound()
+            service = AuthService(engine.sync, self.hasher)
+            await engine.run(service.rehash_password, user, new_hash)
+        except PasswordHasherBusy:
+            pass
+        except Exception:
+            logger.exception("Rehashing password for user %s failed", user["id"])
+
+    def generate_token(self, user_id: int, email: Optional[str] = None,
+                       username: Optional[str] = None) -> str:
+        return self._service.generate_token(user_id, email, username)
+
+    def verify_token(self, token: str) -> Optional[dict]:
+        return self._service.verify_token(token)
+
+    async def hash_password(self, password: str) -> str:
+        return await self.hasher.hash_async(password)
+
+    async def hash_passwords(self, passwords: List[str]) -> List[str]:
+        return await self.hasher.hash_many_async(passwords)
@@ -0,0 +1,28 @@
+"""
+Bulk helpers - multi-row inserts committed a chunk at a time
+"""
+
+from typing import List
+
+from db.database import Database
+
+# Rows per transaction for bulk inserts
+BULK_CHUNK_SIZE = 1000
+
+
+def insert_rows(db: Database, query: str, rows: List[dict]) -> List[dict]:
+    """Run ``query`` once per row, BULK_CHUNK_SIZE rows per execute_many().
+
+    On an unbound handle each chunk is its own transaction, so the write
+    lock is released between chunks; inside a session every chunk joins
+    the session's transaction. Returns one ``{"id": ...}`` or
+    ``{"error": ...}`` per row, in input order.
+    """
+    results = []
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        outcomes = db.execute_many(query, rows[start:start + BULK_CHUNK_SIZE])
+        results.extend(
+            {"error": outcome["error"]} if "error" in outcome else {"id": outcome["lastrowid"]}
+            for outcome in outcomes
+        )
+    return results
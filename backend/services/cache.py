@@ -0,0 +1,210 @@
+"""
+Cache - Read-through caching for service lookups
+"""
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class Cache(ABC):
+    """Interface shared by the cache backends.
+
+    Values are flat row dicts; backends hand out copies so callers can
+    mutate what they get back.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: dict, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, *keys: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class MemoryCache(Cache):
+    """In-process LRU cache with per-entry expiry.
+
+    Each worker process has its own copy, so invalidations are local; the
+    TTL bounds how long another worker can serve a stale row.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def set(self, key: str, value: dict, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+class RedisCache(Cache):
+    """Cache stored in Redis, shared by every worker process.
+
+    ``client`` only needs redis-py's ``get``/``set(ex=)``/``delete``, so a
+    local fake can stand in for a real server.
+    """
+
+    def __init__(self, client, ttl: float = 300.0, prefix: str = "app:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCache":
+        """Connect with redis-py, which is only needed for this backend."""
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RedisCache requires the 'redis' package") from None
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self.client.get(self.prefix + key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: dict, ttl: Optional[float] = None):
+        seconds = max(1, int(self.ttl if ttl is None else ttl))
+        self.client.set(self.prefix + key, json.dumps(value), ex=seconds)
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self):
+        # Only the local counters; other processes share the keyspace.
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        evictions = None
+        if hasattr(self.client, "info"):
+            evictions = self.client.info("stats").get("evicted_keys")
+        lookups = hits + misses
+        return {
+            "backend": "redis",
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "evictions": evictions,
+        }
+
+
+def cache_committed(cache: Cache, db, *entries: Tuple[str, dict]):
+    """Cache ``(key, value)`` entries read through ``db``.
+
+    Nothing is cached while ``db`` has a transaction open: the rows it
+    read there could still be rolled back, which would leave the cache
+    ahead of the database.
+    """
+    if db.in_transaction:
+        return
+    for key, value in entries:
+        cache.set(key, value)
+
+
+def _cache_from_env() -> Cache:
+    ttl = float(os.environ.get("CACHE_TTL", 300))
+    url = os.environ.get("CACHE_URL")
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache.from_url(url, ttl=ttl)
+    return MemoryCache(maxsize=int(os.environ.get("CACHE_MAXSIZE", 10_000)), ttl=ttl)
+
+
+# Global cache shared by all service instances in this process
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    """Return the process-wide cache, creating it from the environment."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _cache_from_env()
+    return _cache
+
+
+def set_cache(cache: Cache):
+    """Replace the process-wide cache, e.g. with a fake in tests."""
+    global _cache
+    _cache = cache
@@ -0,0 +1,47 @@
+"""
+Pagination helpers - opaque keyset cursors
+"""
+
+import base64
+import binascii
+import json
+from typing import Tuple
+
+# Largest page a listing endpoint will return, whatever the client asks for
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(*values) -> str:
+    """Pack the sort key of the last row on a page into an opaque token."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, *types: type) -> list:
+    """Unpack a token made by encode_cursor, checking each value's type."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Malformed cursor") from None
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise InvalidCursor("Malformed cursor")
+    for value, expected in zip(values, types):
+        if type(value) is not expected:
+            raise InvalidCursor("Malformed cursor")
+    return values
+
+
+def split_page(rows: list, limit: int) -> Tuple[list, bool]:
+    """Trim a ``limit + 1`` row fetch to ``limit`` rows and say whether more follow."""
+    return rows[:limit], len(rows) > limit
+
+
+def clamp_limit(limit: int) -> int:
+    """Bound a requested page size to 1..MAX_PAGE_SIZE."""
+    return max(1, min(limit, MAX_PAGE_SIZE))
@@ -0,0 +1,152 @@
+"""
+Passwords - scrypt hashing on a bounded worker pool
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when too many hash operations are already queued."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+class PasswordHasher:
+    """scrypt password hashing with a tunable cost.
+
+    Hashes are stored as ``scrypt$ln=14,r=8,p=1$<salt>$<hash>`` so they
+    carry the parameters they were made with. The ``*_async`` methods run
+    on a dedicated thread pool (hashlib releases the GIL while it works)
+    and refuse new work once ``max_pending`` operations are queued, so a
+    login burst cannot starve the event loop or the database executor.
+    """
+
+    algorithm = "scrypt"
+
+    def __init__(self, log_n: int = 14, r: int = 8, p: int = 1, max_workers: Optional[int] = None,
+                 max_pending: int = 64):
+        self.log_n = log_n
+        self.r = r
+        self.p = p
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    @property
+    def pending(self) -> int:
+        """Hash operations queued or running on the pool."""
+        return self._pending
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, log_n: int, r: int, p: int) -> bytes:
+        n = 1 << log_n
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p,
+            maxmem=256 * r * (n + p), dklen=32,
+        )
+
+    def hash(self, password: str) -> str:
+        """Hash ``password`` with the current parameters. Blocks while it works."""
+        salt = secrets.token_bytes(16)
+        digest = self._derive(password, salt, self.log_n, self.r, self.p)
+        params = f"ln={self.log_n},r={self.r},p={self.p}"
+        return f"{self.algorithm}${params}${_b64encode(salt)}${_b64encode(digest)}"
+
+    @staticmethod
+    def parse(encoded: str) -> Optional[dict]:
+        """Split a stored hash into its parameters, salt and digest."""
+        try:
+            algorithm, params, salt, digest = encoded.split("$")
+            if algorithm != PasswordHasher.algorithm:
+                return None
+            values = dict(item.split("=", 1) for item in params.split(","))
+            return {
+                "log_n": int(values["ln"]),
+                "r": int(values["r"]),
+                "p": int(values["p"]),
+                "salt": _b64decode(salt),
+                "digest": _b64decode(digest),
+            }
+        except (ValueError, KeyError):
+            return None
+
+    def verify(self, password: str, encoded: str) -> bool:
+        """Check ``password`` against a stored hash. Blocks while it works.
+
+        Rows written before hashing existed hold the password itself; they
+        still verify, and needs_rehash() flags them for an upgrade.
+        """
+        parsed = self.parse(encoded)
+        if parsed is None:
+            return bool(encoded) and hmac.compare_digest(password.encode(), encoded.encode())
+        digest = self._derive(password, parsed["salt"], parsed["log_n"], parsed["r"], parsed["p"])
+        return hmac.compare_digest(digest, parsed["digest"])
+
+    def needs_rehash(self, encoded: str) -> bool:
+        """Whether a stored hash was made with other than the current parameters."""
+        parsed = self.parse(encoded)
+        if parsed is None:
+            return True
+        return (parsed["log_n"], parsed["r"], parsed["p"]) != (self.log_n, self.r, self.p)
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            raise PasswordHasherBusy("Too many password operations in flight")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash_async(self, password: str) -> str:
+        """Hash on the worker pool."""
+        return await self._run(self.hash, password)
+
+    async def verify_async(self, password: str, encoded: str) -> bool:
+        """Verify on the worker pool."""
+        return await self._run(self.verify, password, encoded)
+
+    async def hash_many_async(self, passwords: List[str]) -> List[str]:
+        """Hash a batch a pool's width at a time, leaving queue room for logins."""
+        width = max(1, min(self.max_workers, self.max_pending // 2))
+        hashes = []
+        for start in range(0, len(passwords), width):
+            chunk = passwords[start:start + width]
+            hashes.extend(await asyncio.gather(*(self.hash_async(password) for password in chunk)))
+        return hashes
+
+
+# Global hasher configured from the environment
+_hasher = PasswordHasher(
+    log_n=int(os.environ.get("PASSWORD_HASH_LOG_N", 14)),
+    max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS", 0)) or None,
+    max_pending=int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 64)),
+)
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Return the process-wide password hasher."""
+    return _hasher
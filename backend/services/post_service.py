@@ -2,57 +2,411 @@
 Post Service - Business logic for post management
 """
 
-from typing import Optional, List
+import html
+import re
+import sqlite3
+from contextlib import aclosing
+from functools import partial
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
 from db.database import Database
+from db.async_database import AsyncDatabase
+from .bulk import insert_rows
+from .cache import Cache, cache_committed, get_cache
+from .pagination import encode_cursor, decode_cursor, clamp_limit, split_page
+from .totals import posts_total
+from .updates import returning, supplied_fields, update_statement
+from .user_service import UserService, public_user
+
+INSERT_POST_QUERY = (
+    "INSERT INTO posts (title, content, user_id) VALUES (:title, :content, :user_id)"
+)
+CREATE_POST_QUERY = returning(INSERT_POST_QUERY)
+
+EXPORT_POSTS_QUERY = (
+    "SELECT id, title, content, user_id AS author_id, created_at FROM posts ORDER BY id"
+)
+
+# Columns update_post() may write
+UPDATABLE_POST_FIELDS = ("title", "content")
+
+# Ranked full-text matches; bm25() is lower for better matches and a title
+# hit weighs ten times a content hit. Every match has to be scored, but the
+# join and the snippet are only computed for the rows on the page. Matches
+# are marked with control characters until search_posts() has escaped the
+# text around them.
+SEARCH_POSTS_QUERY = (
+    "SELECT posts.*, page.rank, ("
+    "SELECT snippet(posts_fts, -1, char(2), char(3), '…', 16) FROM posts_fts "
+    "WHERE posts_fts MATCH :match AND rowid = page.id"
+    ") AS snippet FROM ("
+    "SELECT * FROM ("
+    "SELECT rowid AS id, bm25(posts_fts, 10.0, 1.0) AS rank FROM posts_fts WHERE posts_fts MATCH :match"
+    ") WHERE (rank, id) > (:rank, :id) ORDER BY rank, id LIMIT :limit"
+    ") AS page JOIN posts ON posts.id = page.id ORDER BY page.rank, page.id"
+)
+
+
+class UnknownAuthor(ValueError):
+    """Raised when a post names a user that does not exist."""
+
+
+_SEARCH_TERM = re.compile(r"\w+")
+# The match markers, which strip_markers() keeps out of stored text
+_MARKERS = str.maketrans("", "", "\x02\x03")
+
+
+def strip_markers(text: str) -> str:
+    """Drop the control characters that highlight() turns into <mark> tags.
+
+    Every title and content is written through here, so a post cannot
+    smuggle its own markup into search snippets.
+    """
+    return text.translate(_MARKERS)
+
+
+def highlight(snippet: str) -> str:
+    """HTML-escape a raw snippet and wrap its matches in <mark>."""
+    return html.escape(snippet).replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def match_expression(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching posts that contain every word.
+
+    Each word is quoted, so operators and punctuation in user input are
+    searched for literally instead of failing to parse. None if ``text``
+    has no words.
+    """
+    terms = _SEARCH_TERM.findall(text)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
 
 
 class PostService:
     """Service for post-related operations."""
 
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, cache: Optional[Cache] = None):
         self.db = db
+        self.cache = cache if cache is not None else get_cache()
+
+    def get_all_posts(
+        self,
+        skip: int = 0,
+        limit: int = 50,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> List[dict]:
+        """Retrieve a page of posts, newest first."""
+        posts, _ = self.get_posts_page(skip, limit, after, expand_author)
+        return posts
+
+    def get_posts_page(
+        self,
+        skip: int = 0,
+        limit: int = 50,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> Tuple[List[dict], bool]:
+        """Retrieve a page of posts, newest first, and whether more follow.
+
+        ``after`` is a cursor from post_cursor(); the (created_at, id) row
+        value comparison seeks directly to the next page instead of
+        skipping rows. With ``expand_author`` each post carries its author
+        under ``"author"``.
+        """
+        limit = clamp_limit(limit)
+        if after is not None:
+            created_at, post_id = decode_cursor(after, str, int)
+            result = self.db.fetch_all(
+                "SELECT * FROM posts WHERE (created_at, id) < (:created_at, :id) "
+                "ORDER BY created_at DESC, id DESC LIMIT :limit",
+                {"created_at": created_at, "id": post_id, "limit": limit + 1},
+                max_rows=limit + 1
+            )
+        else:
+            result = self.db.fetch_all(
+                "SELECT * FROM posts ORDER BY created_at DESC, id DESC LIMIT :limit OFFSET :skip",
+                {"limit": limit + 1, "skip": max(skip, 0)},
+                max_rows=limit + 1
+            )
+        posts, has_more = split_page(result or [], limit)
+        if expand_author:
+            self._embed_authors(posts)
+        return posts, has_more
+
+    def count_posts(self) -> int:
+        """Approximate number of posts, without counting on every call."""
+        return posts_total.get(self.db)
+
+    @staticmethod
+    def post_cursor(post: dict) -> str:
+        """Cursor pointing just past ``post`` in get_all_posts order."""
+        return encode_cursor(post["created_at"], post["id"])
 
-    def get_all_posts(self) -> List[dict]:
-        """Retrieve all posts."""
-        result = self.db.fetch_all("SELECT * FROM posts ORDER BY created_at DESC")
-        return result or []
+    def iter_posts(self) -> Iterator[dict]:
+        """Stream every post in id order."""
+        return self.db.fetch_iter(EXPORT_POSTS_QUERY)
 
     def get_post_by_id(self, post_id: int) -> Optional[dict]:
         """Get a specific post by ID."""
+        key = f"post:{post_id}"
+        result = self.cache.get(key)
+        if result is not None:
+            return result
         result = self.db.fetch_one(
             "SELECT * FROM posts WHERE id = :id",
             {"id": post_id}
         )
+        if result is not None:
+            cache_committed(self.cache, self.db, (key, result))
         return result
 
-    def get_posts_by_user(self, user_id: int) -> List[dict]:
-        """Get all posts by a specific user."""
+    def get_posts_by_user(
+        self,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 50,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> List[dict]:
+        """Get a page of posts by a specific user, newest first."""
+        posts, _ = self.get_user_posts_page(user_id, skip, limit, after, expand_author)
+        return posts
+
+    def get_user_posts_page(
+        self,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 50,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> Tuple[List[dict], bool]:
+        """Get a page of a user's posts, newest first, and whether more follow."""
+        limit = clamp_limit(limit)
+        if after is not None:
+            created_at, post_id = decode_cursor(after, str, int)
+            result = self.db.fetch_all(
+                "SELECT * FROM posts WHERE user_id = :user_id AND (created_at, id) < (:created_at, :id) "
+                "ORDER BY created_at DESC, id DESC LIMIT :limit",
+                {"user_id": user_id, "created_at": created_at, "id": post_id, "limit": limit + 1},
+                max_rows=limit + 1
+            )
+        else:
+            result = self.db.fetch_all(
+                "SELECT * FROM posts WHERE user_id = :user_id "
+                "ORDER BY created_at DESC, id DESC LIMIT :limit OFFSET :skip",
+                {"user_id": user_id, "limit": limit + 1, "skip": max(skip, 0)},
+                max_rows=limit + 1
+            )
+        posts, has_more = split_page(result or [], limit)
+        if expand_author:
+            self._embed_authors(posts)
+        return posts, has_more
+
+    def search_posts(
+        self,
+        text: str,
+        limit: int = 20,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> Tuple[List[dict], bool]:
+        """Find posts containing every word of ``text``, best match first.
+
+        Each row also carries its ``rank`` and a ``snippet`` of the matching
+        text, HTML-escaped with the matches wrapped in <mark>. ``after`` is
+        a cursor from search_cursor(); since ranks shift as posts are
+        written, a page fetched later may overlap its predecessor slightly.
+        """
+        limit = clamp_limit(limit)
+        match = match_expression(text)
+        if match is None:
+            return [], False
+        rank, post_id = decode_cursor(after, float, int) if after is not None else (float("-inf"), 0)
         result = self.db.fetch_all(
-            "SELECT * FROM posts WHERE user_id = :user_id ORDER BY created_at DESC",
-            {"user_id": user_id}
+            SEARCH_POSTS_QUERY,
+            {"match": match, "rank": rank, "id": post_id, "limit": limit + 1},
+            max_rows=limit + 1
         )
-        return result or []
+        posts, has_more = split_page(result or [], limit)
+        for post in posts:
+            post["snippet"] = highlight(post["snippet"])
+        if expand_author:
+            self._embed_authors(posts)
+        return posts, has_more
+
+    @staticmethod
+    def search_cursor(post: dict) -> str:
+        """Cursor for the search page that follows ``post``."""
+        return encode_cursor(post["rank"], post["id"])
+
+    def warm_cache(self, limit: int = 100) -> int:
+        """Cache the newest posts and their authors; returns how many posts were cached."""
+        posts = self.get_all_posts(limit=limit)
+        for post in posts:
+            self.cache.set(f"post:{post['id']}", post)
+        authors = UserService(self.db, self.cache).get_users_by_ids(post["user_id"] for post in posts)
+        for author in authors.values():
+            self.cache.set(f"user:{author['id']}", author)
+        return len(posts)
+
+    def _embed_authors(self, posts: List[dict]):
+        """Attach each post's author, loading all of a page's authors in one query."""
+        authors = UserService(self.db, self.cache).get_users_by_ids(post["user_id"] for post in posts)
+        for post in posts:
+            author = authors.get(post["user_id"])
+            post["author"] = public_user(author) if author else None
 
     def create_post(self, title: str, content: str, user_id: int) -> dict:
-        """Create a new post."""
-        self.db.execute(
-            "INSERT INTO posts (title, content, user_id) VALUES (:title, :content, :user_id)",
-            {"title": title, "content": content, "user_id": user_id}
-        )
-        return {"id": 1, "title": title, "content": content, "user_id": user_id}
+        """Create a new post and return the stored row.
+
+        Raises UnknownAuthor if ``user_id`` names no user.
+        """
+        try:
+            result = self.db.execute(
+                CREATE_POST_QUERY,
+                {"title": strip_markers(title), "content": strip_markers(content), "user_id": user_id}
+            )
+        except sqlite3.IntegrityError as exc:
+            if "FOREIGN KEY" in str(exc):
+                raise UnknownAuthor(user_id) from None
+            raise
+        self.db.on_commit(partial(posts_total.add, 1))
+        return result["row"]
+
+    def create_posts(self, posts: List[dict]) -> List[dict]:
+        """Insert many posts, each needing ``title``, ``content`` and ``user_id``.
+
+        A post whose author does not exist gets an ``{"error": ...}`` entry
+        instead of failing its whole chunk.
+        """
+        results = insert_rows(self.db, INSERT_POST_QUERY, [
+            {
+                "title": strip_markers(post["title"]),
+                "content": strip_markers(post["content"]),
+                "user_id": post["user_id"],
+            }
+            for post in posts
+        ])
+        self.db.on_commit(partial(posts_total.add, sum(1 for result in results if "id" in result)))
+        return results
 
     def update_post(self, post_id: int, data: dict) -> Optional[dict]:
-        """Update an existing post."""
-        self.db.execute(
-            "UPDATE posts SET title = :title, content = :content WHERE id = :id",
-            {"id": post_id, **data}
+        """Update an existing post, writing only when a field changes.
+
+        Returns the stored row, or None for an unknown post. When nothing
+        differs from the stored row the version is left as it was.
+        """
+        fields = {
+            column: strip_markers(value)
+            for column, value in supplied_fields(data, UPDATABLE_POST_FIELDS).items()
+        }
+        if fields:
+            result = self.db.execute(
+                update_statement("posts", tuple(fields)),
+                {"id": post_id, **fields}
+            )
+            if result["row"] is not None:
+                self.db.on_commit(partial(self.cache.delete, f"post:{post_id}"))
+                return result["row"]
+        # Nothing changed, or there is no such post.
+        return self.db.fetch_one(
+            "SELECT * FROM posts WHERE id = :id",
+            {"id": post_id}
         )
-        return {"id": post_id, **data}
 
     def delete_post(self, post_id: int) -> bool:
-        """Delete a post by ID."""
-        self.db.execute(
+        """Delete a post by ID; False if there was no such post."""
+        result = self.db.execute(
             "DELETE FROM posts WHERE id = :id",
             {"id": post_id}
         )
-        return True
+        self.db.on_commit(partial(self.cache.delete, f"post:{post_id}"))
+        self.db.on_commit(partial(posts_total.add, -result["rowcount"]))
+        return result["rowcount"] > 0
+
+
+class AsyncPostService:
+    """Awaitable PostService; each call runs on the database executor."""
+
+    def __init__(self, db: AsyncDatabase, cache: Optional[Cache] = None):
+        self.db = db
+        self._service = PostService(db.sync, cache)
+
+    async def get_all_posts(
+        self,
+        skip: int = 0,
+        limit: int = 50,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> List[dict]:
+        return await self.db.run(self._service.get_all_posts, skip, limit, after, expand_author)
+
+    async def get_posts_page(
+        self,
+        skip: int = 0,
+        limit: int = 50,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> Tuple[List[dict], bool]:
+        return await self.db.run(self._service.get_posts_page, skip, limit, after, expand_author)
+
+    async def count_posts(self) -> int:
+        return await self.db.run(self._service.count_posts)
+
+    post_cursor = staticmethod(PostService.post_cursor)
+
+    async def iter_posts(self) -> AsyncIterator[dict]:
+        # Closing the rows hands their connection back as soon as we stop.
+        async with aclosing(self.db.fetch_iter(EXPORT_POSTS_QUERY)) as rows:
+            async for row in rows:
+                yield row
+
+    async def get_post_by_id(self, post_id: int) -> Optional[dict]:
+        return await self.db.run(self._service.get_post_by_id, post_id)
+
+    async def get_posts_by_user(
+        self,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 50,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> List[dict]:
+        return await self.db.run(
+            self._service.get_posts_by_user, user_id, skip, limit, after, expand_author
+        )
+
+    async def get_user_posts_page(
+        self,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 50,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> Tuple[List[dict], bool]:
+        return await self.db.run(
+            self._service.get_user_posts_page, user_id, skip, limit, after, expand_author
+        )
+
+    async def search_posts(
+        self,
+        text: str,
+        limit: int = 20,
+        after: Optional[str] = None,
+        expand_author: bool = False,
+    ) -> Tuple[List[dict], bool]:
+        return await self.db.run(self._service.search_posts, text, limit, after, expand_author)
+
+    search_cursor = staticmethod(PostService.search_cursor)
+
+    async def create_post(self, title: str, content: str, user_id: int) -> dict:
+        return await self.db.run(self._service.create_post, title, content, user_id)
+
+    async def create_posts(self, posts: List[dict]) -> List[dict]:
+        return await self.db.run(self._service.create_posts, posts)
+
+    async def update_post(self, post_id: int, data: dict) -> Optional[dict]:
+        return await self.db.run(self._service.update_post, post_id, data)
+
+    async def delete_post(self, post_id: int) -> bool:
+        return await self.db.run(self._service.delete_post, post_id)
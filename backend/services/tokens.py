@@ -0,0 +1,92 @@
+"""
+Tokens - Stateless HS256 JSON Web Tokens
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from functools import lru_cache
+from typing import Optional
+
+from .cache import MemoryCache
+
+# Every worker must share the secret; the random fallback only suits a
+# single process (forked workers inherit it from the preloaded app).
+JWT_SECRET = os.environ.get("JWT_SECRET") or secrets.token_urlsafe(32)
+JWT_TTL_SECONDS = int(os.environ.get("JWT_TTL_SECONDS", 3600))
+
+_HEADER = base64.urlsafe_b64encode(
+    json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode()
+).rstrip(b"=")
+
+# Recently verified tokens, so hot clients skip the HMAC and JSON parsing
+_verified = MemoryCache(maxsize=4096)
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+@lru_cache(maxsize=4)
+def _signer(secret: str) -> "hmac.HMAC":
+    """HMAC keyed with ``secret``; copies reuse the prepared key schedule."""
+    return hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+
+def _sign(signing_input: bytes, secret: str) -> bytes:
+    signer = _signer(secret).copy()
+    signer.update(signing_input)
+    return _b64encode(signer.digest())
+
+
+def create_token(user_id: int, claims: Optional[dict] = None, ttl: Optional[int] = None,
+                 secret: Optional[str] = None) -> str:
+    """Issue a signed token for ``user_id`` carrying extra ``claims``."""
+    now = int(time.time())
+    payload = {
+        **(claims or {}),
+        "sub": str(user_id),
+        "iat": now,
+        "exp": now + (JWT_TTL_SECONDS if ttl is None else ttl),
+    }
+    signing_input = _HEADER + b"." + _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return (signing_input + b"." + _sign(signing_input, secret or JWT_SECRET)).decode()
+
+
+def decode_token(token: str, secret: Optional[str] = None) -> Optional[dict]:
+    """Return the claims of a valid, unexpired token, or None."""
+    secret = secret or JWT_SECRET
+    cache_key = f"{hash(secret)}:{token}"
+    claims = _verified.get(cache_key)
+    if claims is not None:
+        return claims if claims["exp"] > time.time() else None
+
+    try:
+        header, payload, signature = token.encode().split(b".")
+    except (UnicodeEncodeError, ValueError):
+        return None
+    if header != _HEADER:
+        return None
+    if not hmac.compare_digest(signature, _sign(header + b"." + payload, secret)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+        user_id = int(claims["sub"])
+        expires_at = int(claims["exp"])
+    except (ValueError, TypeError, KeyError):
+        return None
+
+    remaining = expires_at - time.time()
+    if remaining <= 0:
+        return None
+    claims["user_id"] = user_id
+    _verified.set(cache_key, claims, ttl=remaining)
+    return claims
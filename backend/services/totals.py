@@ -0,0 +1,51 @@
+"""
+Totals - approximate row counts for listing metadata
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+
+# How long a count is trusted before it is read from the table again
+TOTALS_REFRESH_SECONDS = float(os.environ.get("TOTALS_REFRESH_SECONDS", 60))
+
+
+class ApproximateTotal:
+    """Row count kept current by the services and re-read now and then.
+
+    create/delete paths adjust the count once their writes commit, so
+    listings can show a total without a ``COUNT(*)`` per request. Each
+    worker keeps its own count and misses the others' writes until the
+    next refresh, hence "approximate".
+    """
+
+    def __init__(self, count_query: str, refresh_interval: float = TOTALS_REFRESH_SECONDS):
+        self.count_query = count_query
+        self.refresh_interval = refresh_interval
+        self._value: Optional[int] = None
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db) -> int:
+        """Current count, recounted with ``db`` when it is missing or stale."""
+        with self._lock:
+            if self._value is not None and time.monotonic() - self._refreshed_at < self.refresh_interval:
+                return self._value
+        row = db.fetch_one(self.count_query)
+        with self._lock:
+            self._value = row["count"]
+            self._refreshed_at = time.monotonic()
+            return self._value
+
+    def add(self, delta: int):
+        """Adjust the count for rows inserted (positive) or deleted (negative)."""
+        if delta:
+            with self._lock:
+                if self._value is not None:
+                    self._value = max(0, self._value + delta)
+
+
+# Process-wide totals, shared by the sync and async services
+users_total = ApproximateTotal("SELECT COUNT(*) AS count FROM users")
+posts_total = ApproximateTotal("SELECT COUNT(*) AS count FROM posts")
@@ -0,0 +1,41 @@
+"""
+Update helpers - writes that hand back the rows they store
+"""
+
+from functools import lru_cache
+from typing import Tuple
+
+
+def supplied_fields(data: dict, columns: Tuple[str, ...]) -> dict:
+    """Pick the writable ``columns`` that ``data`` sets.
+
+    Unknown keys and None values (every writable column is NOT NULL) are
+    ignored. The result keeps ``columns`` order, so each combination of
+    fields always maps to the same statement text.
+    """
+    return {column: data[column] for column in columns if data.get(column) is not None}
+
+
+def returning(query: str) -> str:
+    """``query`` with a RETURNING clause.
+
+    The write then hands back the stored row, defaults and triggers
+    included, so nothing has to read it again.
+    """
+    return f"{query} RETURNING *"
+
+
+@lru_cache(maxsize=256)
+def update_statement(table: str, columns: Tuple[str, ...]) -> str:
+    """UPDATE setting ``columns`` of the row ``:id``, generated once per combination.
+
+    The comparison with the stored values happens in the statement itself,
+    under the write lock: a row whose ``columns`` already hold the new
+    values is not matched, so it is neither written nor re-versioned. A
+    matched row has its version bumped and is returned.
+    """
+    assignments = ", ".join(f"{column} = :{column}" for column in columns)
+    differs = " OR ".join(f"{column} IS NOT :{column}" for column in columns)
+    return returning(
+        f"UPDATE {table} SET {assignments}, version = version + 1 WHERE id = :id AND ({differs})"
+    )
@@ -2,57 +2,299 @@
 User Service - Business logic for user management
 """
 
-from typing import Optional, List
+import json
+import sqlite3
+from contextlib import aclosing, closing
+from functools import partial
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
 from db.database import Database
+from db.async_database import AsyncDatabase
+from .bulk import insert_rows
+from .cache import Cache, cache_committed, get_cache
+from .pagination import encode_cursor, decode_cursor, clamp_limit, split_page
+from .passwords import PasswordHasher, get_password_hasher
+from .totals import posts_total, users_total
+from .updates import returning, supplied_fields, update_statement
+
+
+# Ids are bound as one JSON array so the statement text never changes
+BATCH_USERS_QUERY = "SELECT * FROM users WHERE id IN (SELECT value FROM json_each(:ids))"
+BATCH_CHUNK_SIZE = 500
+
+INSERT_USER_QUERY = (
+    "INSERT INTO users (email, username, password) VALUES (:email, :username, :password)"
+)
+CREATE_USER_QUERY = returning(INSERT_USER_QUERY)
+
+EXPORT_USERS_QUERY = "SELECT id, email, username, is_active, created_at FROM users ORDER BY id"
+
+PUBLIC_USER_FIELDS = ("id", "email", "username", "is_active", "version")
+
+# Columns update_user() may write
+UPDATABLE_USER_FIELDS = ("email", "username")
+
+
+class DuplicateEmail(ValueError):
+    """Raised when another user already has the email being written."""
+
+
+def _duplicate_email(exc: sqlite3.IntegrityError) -> bool:
+    return "users.email" in str(exc)
+
+
+def export_user(row: dict) -> dict:
+    """Give an export row the boolean ``is_active`` the other user endpoints return."""
+    row["is_active"] = bool(row["is_active"])
+    return row
+
+
+def public_user(user: dict) -> dict:
+    """Strip a user row down to the fields safe to embed in other responses."""
+    return {field: user[field] for field in PUBLIC_USER_FIELDS}
 
 
 class UserService:
     """Service for user-related operations."""
 
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, cache: Optional[Cache] = None):
         self.db = db
+        self.cache = cache if cache is not None else get_cache()
+
+    def get_all_users(self, skip: int = 0, limit: int = 100, after: Optional[str] = None) -> List[dict]:
+        """Retrieve a page of users ordered by id."""
+        users, _ = self.get_users_page(skip, limit, after)
+        return users
+
+    def get_users_page(
+        self, skip: int = 0, limit: int = 100, after: Optional[str] = None
+    ) -> Tuple[List[dict], bool]:
+        """Retrieve a page of users ordered by id, and whether more follow.
+
+        ``after`` is a cursor from user_cursor(); it seeks straight to the
+        next id instead of skipping rows, so deep pages cost the same as the
+        first one. One extra row is read to answer "has more" without a
+        count.
+        """
+        limit = clamp_limit(limit)
+        if after is not None:
+            (after_id,) = decode_cursor(after, int)
+            result = self.db.fetch_all(
+                "SELECT * FROM users WHERE id > :after_id ORDER BY id LIMIT :limit",
+                {"after_id": after_id, "limit": limit + 1},
+                max_rows=limit + 1
+            )
+        else:
+            result = self.db.fetch_all(
+                "SELECT * FROM users ORDER BY id LIMIT :limit OFFSET :skip",
+                {"limit": limit + 1, "skip": max(skip, 0)},
+                max_rows=limit + 1
+            )
+        return split_page(result or [], limit)
 
-    def get_all_users(self) -> List[dict]:
-        """Retrieve all users from database."""
-        result = self.db.fetch_all("SELECT * FROM users")
-        return result or []
+    def count_users(self) -> int:
+        """Approximate number of users, without counting on every call."""
+        return users_total.get(self.db)
+
+    @staticmethod
+    def user_cursor(user: dict) -> str:
+        """Cursor pointing just past ``user`` in get_all_users order."""
+        return encode_cursor(user["id"])
+
+    def iter_users(self) -> Iterator[dict]:
+        """Stream every user in id order, without passwords."""
+        with closing(self.db.fetch_iter(EXPORT_USERS_QUERY)) as rows:
+            for row in rows:
+                yield export_user(row)
 
     def get_user_by_id(self, user_id: int) -> Optional[dict]:
         """Get a specific user by ID."""
+        key = f"user:{user_id}"
+        result = self.cache.get(key)
+        if result is not None:
+            return result
         result = self.db.fetch_one(
             "SELECT * FROM users WHERE id = :id",
             {"id": user_id}
         )
+        if result is not None:
+            cache_committed(self.cache, self.db, (key, result))
         return result
 
+    def get_users_by_ids(self, user_ids: Iterable[int]) -> Dict[int, dict]:
+        """Fetch many users at once, keyed by id; unknown ids are left out."""
+        ids = list(dict.fromkeys(user_ids))
+        users = {}
+        for start in range(0, len(ids), BATCH_CHUNK_SIZE):
+            chunk = ids[start:start + BATCH_CHUNK_SIZE]
+            rows = self.db.fetch_all(BATCH_USERS_QUERY, {"ids": json.dumps(chunk)})
+            users.update((row["id"], row) for row in rows)
+        return users
+
     def get_user_by_email(self, email: str) -> Optional[dict]:
-        """Get user by email address."""
+        """Get user by email address.
+
+        The cache maps the email to an id only, so invalidating ``user:{id}``
+        is enough when the user changes email or is deleted.
+        """
+        key = f"user:email:{email}"
+        ref = self.cache.get(key)
+        if ref is not None:
+            result = self.get_user_by_id(ref["id"])
+            if result is not None and result["email"] == email:
+                return result
         result = self.db.fetch_one(
             "SELECT * FROM users WHERE email = :email",
             {"email": email}
         )
+        if result is not None:
+            cache_committed(
+                self.cache, self.db,
+                (key, {"id": result["id"]}),
+                (f"user:{result['id']}", result),
+            )
         return result
 
     def create_user(self, email: str, username: str, password: str) -> dict:
-        """Create a new user."""
-        self.db.execute(
-            "INSERT INTO users (email, username, password) VALUES (:email, :username, :password)",
-            {"email": email, "username": username, "password": password}
-        )
-        return {"id": 1, "email": email, "username": username}
+        """Create a new user and return the stored row.
+
+        Raises DuplicateEmail if the email is taken.
+        """
+        try:
+            result = self.db.execute(
+                CREATE_USER_QUERY,
+                {"email": email, "username": username, "password": password}
+            )
+        except sqlite3.IntegrityError as exc:
+            # A concurrent registration can win between the route's check and here.
+            if _duplicate_email(exc):
+                raise DuplicateEmail(email) from None
+            raise
+        self.db.on_commit(partial(self.cache.delete, f"user:email:{email}"))
+        self.db.on_commit(partial(users_total.add, 1))
+        return result["row"]
+
+    def create_users(self, users: List[dict]) -> List[dict]:
+        """Insert many users, each needing ``email``, ``username`` and ``password``.
+
+        A taken email fails only its own entry; any cached lookup of the
+        submitted emails is dropped once the inserts commit.
+        """
+        results = insert_rows(self.db, INSERT_USER_QUERY, [
+            {"email": user["email"], "username": user["username"], "password": user["password"]}
+            for user in users
+        ])
+        stale = [f"user:email:{user['email']}" for user in users]
+        self.db.on_commit(partial(self.cache.delete, *stale))
+        self.db.on_commit(partial(users_total.add, sum(1 for result in results if "id" in result)))
+        return results
 
     def update_user(self, user_id: int, data: dict) -> Optional[dict]:
-        """Update an existing user."""
-        self.db.execute(
-            "UPDATE users SET email = :email, username = :username WHERE id = :id",
-            {"id": user_id, **data}
+        """Update an existing user, writing only when a field changes.
+
+        Returns the stored row, or None for an unknown user. When nothing
+        differs from the stored row the version is left as it was. Raises
+        DuplicateEmail if the new email is taken.
+        """
+        fields = supplied_fields(data, UPDATABLE_USER_FIELDS)
+        if fields:
+            try:
+                result = self.db.execute(
+                    update_statement("users", tuple(fields)),
+                    {"id": user_id, **fields}
+                )
+            except sqlite3.IntegrityError as exc:
+                if _duplicate_email(exc):
+                    raise DuplicateEmail(fields["email"]) from None
+                raise
+            if result["row"] is not None:
+                self.db.on_commit(partial(self.cache.delete, f"user:{user_id}"))
+                return result["row"]
+        # Nothing changed, or there is no such user. Read the database, not
+        # the cache, so a stale entry is never handed back.
+        return self.db.fetch_one(
+            "SELECT * FROM users WHERE id = :id",
+            {"id": user_id}
         )
-        return {"id": user_id, **data}
 
     def delete_user(self, user_id: int) -> bool:
-        """Delete a user by ID."""
-        self.db.execute(
+        """Delete a user by ID; False if there was no such user."""
+        # The user's posts go with it through ON DELETE CASCADE.
+        post_ids = self.db.fetch_all(
+            "SELECT id FROM posts WHERE user_id = :user_id",
+            {"user_id": user_id}
+        )
+        result = self.db.execute(
             "DELETE FROM users WHERE id = :id",
             {"id": user_id}
         )
-        return True
+        stale = [f"user:{user_id}", *(f"post:{row['id']}" for row in post_ids)]
+        self.db.on_commit(partial(self.cache.delete, *stale))
+        if result["rowcount"]:
+            self.db.on_commit(partial(users_total.add, -1))
+            self.db.on_commit(partial(posts_total.add, -len(post_ids)))
+        return result["rowcount"] > 0
+
+
+class AsyncUserService:
+    """Awaitable UserService; each call runs on the database executor."""
+
+    def __init__(self, db: AsyncDatabase, cache: Optional[Cache] = None):
+        self.db = db
+        self._service = UserService(db.sync, cache)
+
+    async def get_all_users(self, skip: int = 0, limit: int = 100, after: Optional[str] = None) -> List[dict]:
+        return await self.db.run(self._service.get_all_users, skip, limit, after)
+
+    async def get_users_page(
+        self, skip: int = 0, limit: int = 100, after: Optional[str] = None
+    ) -> Tuple[List[dict], bool]:
+        return await self.db.run(self._service.get_users_page, skip, limit, after)
+
+    async def count_users(self) -> int:
+        return await self.db.run(self._service.count_users)
+
+    user_cursor = staticmethod(UserService.user_cursor)
+
+    async def iter_users(self) -> AsyncIterator[dict]:
+        # Closing the rows hands their connection back as soon as we stop.
+        async with aclosing(self.db.fetch_iter(EXPORT_USERS_QUERY)) as rows:
+            async for row in rows:
+                yield export_user(row)
+
+    async def get_user_by_id(self, user_id: int) -> Optional[dict]:
+        return await self.db.run(self._service.get_user_by_id, user_id)
+
+    async def get_users_by_ids(self, user_ids: Iterable[int]) -> Dict[int, dict]:
+        return await self.db.run(self._service.get_users_by_ids, list(user_ids))
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        return await self.db.run(self._service.get_user_by_email, email)
+
+    async def create_user(self, email: str, username: str, password: str) -> dict:
+        return await self.db.run(self._service.create_user, email, username, password)
+
+    async def create_users(self, users: List[dict]) -> List[dict]:
+        return await self.db.run(self._service.create_users, users)
+
+    async def register(self, email: str, username: str, password: str,
+                       hasher: Optional[PasswordHasher] = None) -> dict:
+        """Create a user from a plain-text password.
+
+        Call it on an unbound handle: the email check and the insert each
+        borrow a connection only for themselves, so none is held while the
+        password is hashed. Raises DuplicateEmail if the email is taken and
+        PasswordHasherBusy if the hasher's queue is full.
+        """
+        if await self.get_user_by_email(email):
+            raise DuplicateEmail(email)
+        hasher = hasher if hasher is not None else get_password_hasher()
+        hashed = await hasher.hash_async(password)
+        async with self.db.session() as db:
+            return await AsyncUserService(db, self._service.cache).create_user(email, username, hashed)
+
+    async def update_user(self, user_id: int, data: dict) -> Optional[dict]:
+        return await self.db.run(self._service.update_user, user_id, data)
+
+    async def delete_user(self, user_id: int) -> bool:
+        return await self.db.run(self._service.delete_user, user_id)
@@ -0,0 +1,85 @@
+"""
+Shared fixtures: a migrated SQLite file per test, private caches and
+totals, and an API client wired to both
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db.database import Database  # noqa: E402
+from db.migrations import run_migrations  # noqa: E402
+from services import cache as cache_module, passwords, post_service, user_service  # noqa: E402
+from services.cache import MemoryCache  # noqa: E402
+from services.passwords import PasswordHasher  # noqa: E402
+from services.totals import ApproximateTotal  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    # A file rather than :memory:, so sessions see SQLite's real locking.
+    database = Database(f"sqlite:///{tmp_path / 'test.db'}?pool_size=3&timeout=1")
+    run_migrations(database)
+    yield database
+    database.disconnect()
+
+
+@pytest.fixture
+def cache():
+    return MemoryCache()
+
+
+@pytest.fixture
+def user_id(db):
+    result = db.execute(
+        "INSERT INTO users (email, username, password) VALUES (:email, :username, :password)",
+        {"email": "ada@example.com", "username": "ada", "password": "x"}
+    )
+    return result["lastrowid"]
+
+
+@pytest.fixture
+def totals(monkeypatch):
+    """Private totals, so tests do not share counts through the module globals."""
+    users = ApproximateTotal("SELECT COUNT(*) AS count FROM users")
+    posts = ApproximateTotal("SELECT COUNT(*) AS count FROM posts")
+    monkeypatch.setattr(user_service, "users_total", users)
+    monkeypatch.setattr(user_service, "posts_total", posts)
+    monkeypatch.setattr(post_service, "posts_total", posts)
+    return users, posts
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    """A cheap process-wide password hasher."""
+    hasher = PasswordHasher(log_n=4, max_workers=2)
+    monkeypatch.setattr(passwords, "_hasher", hasher)
+    yield hasher
+    if hasher._executor is not None:
+        hasher._executor.shutdown()
+
+
+@pytest.fixture
+def client(db, cache, totals, hasher, monkeypatch):
+    """TestClient for the app, serving from the test database."""
+    from fastapi.testclient import TestClient
+
+    from db.async_database import AsyncDatabase, get_async_db, get_async_engine
+    from main import app
+
+    engine = AsyncDatabase(db)
+
+    async def session():
+        async with engine.session() as handle:
+            yield handle
+
+    monkeypatch.setitem(app.dependency_overrides, get_async_engine, lambda: engine)
+    monkeypatch.setitem(app.dependency_overrides, get_async_db, session)
+    monkeypatch.setattr(cache_module, "_cache", cache)
+    # No lifespan: the db fixture is already migrated.
+    yield TestClient(app)
+    if engine._executor is not None:
+        engine._executor.shutdown()
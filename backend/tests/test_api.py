@@ -0,0 +1,65 @@
+import pytest
+
+
+@pytest.fixture
+def registered(client):
+    response = client.post(
+        "/api/auth/register", json={"email": "ada@example.com", "username": "ada", "password": "secret"}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_register_login_and_me(client, registered):
+    assert client.post("/api/auth/register", json={
+        "email": "ada@example.com", "username": "again", "password": "x",
+    }).status_code == 400
+    login = client.post("/api/auth/login", json={"email": "ada@example.com", "password": "secret"})
+    assert login.status_code == 200
+    assert client.post("/api/auth/login", json={"email": "ada@example.com", "password": "wrong"}).status_code == 401
+    me = client.get("/api/auth/me", headers={"Authorization": f"Bearer {login.json()['access_token']}"})
+    assert (me.json()["id"], me.json()["email"]) == (registered["user_id"], "ada@example.com")
+    assert client.get("/api/auth/me").status_code == 401
+
+
+def test_post_lifecycle(client, registered):
+    user_id = registered["user_id"]
+    created = client.post("/api/posts/", json={"title": "Rye", "content": "loaf", "author_id": user_id})
+    assert created.status_code == 200, created.text
+    post = created.json()
+    assert (post["author_id"], post["title"]) == (user_id, "Rye")
+    # Committed before the response, so the next request sees it.
+    assert client.get(f"/api/posts/{post['id']}").json()["title"] == "Rye"
+    updated = client.put(f"/api/posts/{post['id']}", json={"title": "Sourdough"})
+    assert updated.json()["title"] == "Sourdough"
+    assert [row["id"] for row in client.get(f"/api/posts/user/{user_id}").json()] == [post["id"]]
+    assert client.delete(f"/api/posts/{post['id']}").status_code == 200
+    assert client.get(f"/api/posts/{post['id']}").status_code == 404
+    assert client.delete(f"/api/posts/{post['id']}").status_code == 404
+
+
+def test_user_lifecycle(client):
+    created = client.post("/api/users/", json={"email": "grace@example.com", "username": "grace", "password": "x"})
+    assert created.status_code == 200, created.text
+    user_id = created.json()["id"]
+    assert "password" not in created.json()
+    assert client.put(f"/api/users/{user_id}", json={"username": "hopper"}).json()["username"] == "hopper"
+    listing = client.get("/api/users/", params={"with_total": "true"})
+    assert listing.headers["X-Total-Count"] == "1"
+    assert client.delete(f"/api/users/{user_id}").status_code == 200
+    assert client.get(f"/api/users/{user_id}").status_code == 404
+
+
+def test_bulk_routes(client):
+    users = client.post("/api/users/bulk", json=[
+        {"email": "a@example.com", "username": "a", "password": "x"},
+        {"email": "a@example.com", "username": "b", "password": "x"},
+    ])
+    assert users.status_code == 200
+    first, second = users.json()
+    assert "id" in first and "error" in second
+    posts = client.post("/api/posts/bulk", json=[
+        {"title": "T", "content": "C", "author_id": first["id"]},
+        {"title": "T", "content": "C", "author_id": 999},
+    ])
+    assert ["id" in result for result in posts.json()] == [True, False]
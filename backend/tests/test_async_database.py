@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from db.async_database import AsyncDatabase, _ConnectionPermits
+
+INSERT_USER = "INSERT INTO users (email, username, password) VALUES (:email, 'u', 'p')"
+COUNT_USERS = "SELECT COUNT(*) AS count FROM users"
+
+
+@pytest.fixture
+def engine(db):
+    engine = AsyncDatabase(db)
+    yield engine
+    engine.executor.shutdown()
+
+
+def test_session_commits_and_rolls_back(engine):
+    async def scenario():
+        async with engine.session() as db:
+            await db.execute(INSERT_USER, {"email": "a@example.com"})
+            assert db.bound and db.in_transaction
+        with pytest.raises(RuntimeError):
+            async with engine.session() as db:
+                await db.execute(INSERT_USER, {"email": "b@example.com"})
+                raise RuntimeError("boom")
+        async with engine.session() as db:
+            with pytest.raises(ValueError):
+                async with db.savepoint():
+                    await db.execute(INSERT_USER, {"email": "c@example.com"})
+                    raise ValueError("undo c")
+        return await engine.fetch_one(COUNT_USERS)
+
+    assert asyncio.run(scenario())["count"] == 1
+
+
+def test_unbound_queries_wait_for_a_permit_not_a_thread(engine, db):
+    # Sessions hold every connection; the unbound queries must queue on the
+    # event loop instead of parking executor threads in pool.acquire().
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with engine.session() as session:
+                await release.wait()
+                return await session.fetch_one(COUNT_USERS)
+
+        holders = [asyncio.create_task(hold()) for _ in range(db.pool_size)]
+        await asyncio.sleep(0.05)
+        waiting = [asyncio.create_task(engine.fetch_one(COUNT_USERS)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        assert not any(task.done() for task in waiting)
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(*holders, *waiting), timeout=5)
+
+    assert len(asyncio.run(scenario())) == db.pool_size + 5
+
+
+def test_unbound_calls_run_at_most_pool_size_at_once(engine, db):
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    async def scenario():
+        await asyncio.gather(*(engine.run(work) for _ in range(10)))
+
+    asyncio.run(scenario())
+    assert peak[0] <= db.pool_size
+
+
+def test_permits_follow_the_running_loop():
+    permits = _ConnectionPermits(2)
+
+    async def semaphore():
+        return permits.semaphore()
+
+    first = asyncio.run(semaphore())
+    assert asyncio.run(semaphore()) is not first
+
+
+def test_fetch_iter_streams_every_row(engine, db):
+    for n in range(7):
+        db.execute(INSERT_USER, {"email": f"{n}@example.com"})
+
+    async def emails():
+        return [row["email"] async for row in engine.fetch_iter("SELECT email FROM users ORDER BY id", chunk_size=3)]
+
+    assert asyncio.run(emails()) == [f"{n}@example.com" for n in range(7)]
+    assert db.pool._idle.qsize() == db.pool._opened
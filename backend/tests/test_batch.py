@@ -0,0 +1,38 @@
+import pytest
+
+from services import user_service
+from services.pagination import MAX_PAGE_SIZE
+from services.user_service import UserService
+
+pytestmark = pytest.mark.usefixtures("totals")
+
+
+def _create_users(db, cache, count):
+    users = UserService(db, cache)
+    return [users.create_user(f"{n}@example.com", f"u{n}", "x")["id"] for n in range(count)]
+
+
+def _batch_calls(db) -> int:
+    return sum(row["calls"] for row in db.query_stats.top(100) if "json_each" in row["fingerprint"])
+
+
+def test_batch_lookup_reads_in_chunks(db, cache, monkeypatch):
+    monkeypatch.setattr(user_service, "BATCH_CHUNK_SIZE", 2)
+    ids = _create_users(db, cache, 5)
+    db.query_stats.reset()
+    found = UserService(db, cache).get_users_by_ids([ids[4], 999, ids[0], ids[4], ids[2]])
+    assert sorted(found) == sorted([ids[0], ids[2], ids[4]])
+    assert found[ids[2]]["email"] == "2@example.com"
+    # Four distinct ids in chunks of two, each one statement.
+    assert _batch_calls(db) == 2
+
+
+def test_batch_routes(client, db, cache):
+    ids = _create_users(db, cache, 3)
+    listed = client.get("/api/users/", params={"ids": f"{ids[2]},999,{ids[0]}"})
+    assert [user["id"] for user in listed.json()] == [ids[2], ids[0]]
+    keyed = client.post("/api/users/batch", json={"ids": [ids[1], 999]})
+    assert list(keyed.json()) == [str(ids[1])]
+    assert "password" not in keyed.json()[str(ids[1])]
+    assert client.get("/api/users/", params={"ids": "1,x"}).status_code == 400
+    assert client.get("/api/users/", params={"ids": ",".join(["1"] * (MAX_PAGE_SIZE + 1))}).status_code == 400
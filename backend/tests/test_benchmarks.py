@@ -0,0 +1,39 @@
+import sqlite3
+
+from benchmarks.load import _percentile, compare, seed_database
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id, title, content, user_id, created_at FROM posts ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_seeding_is_deterministic_and_reused(tmp_path, hasher):
+    first, second = tmp_path / "a.db", tmp_path / "b.db"
+    seed_database(first, users=5, posts=20, content_size=40)
+    seed_database(second, users=5, posts=20, content_size=40)
+    assert len(_rows(first)) == 20
+    assert _rows(first) == _rows(second)
+    modified = first.stat().st_mtime_ns
+    seed_database(first, users=5, posts=20, content_size=40)
+    assert first.stat().st_mtime_ns == modified
+
+
+def test_percentile_uses_the_nearest_rank():
+    ordered = [float(n) for n in range(1, 101)]
+    assert _percentile(ordered, 0.50) == 50.0
+    assert _percentile(ordered, 0.99) == 100.0
+    assert _percentile([], 0.95) == 0.0
+
+
+def test_compare_flags_only_regressions_past_the_threshold():
+    baseline = {"overall": {"p95_ms": 10.0, "p99_ms": 20.0, "throughput_rps": 1000.0}, "routes": {}}
+    report = {
+        "overall": {"p95_ms": 10.5, "p99_ms": 25.0, "throughput_rps": 850.0},
+        "routes": {"get_user": {"p95_ms": 1.0}},
+    }
+    regressions = compare(report, baseline, threshold=0.10)
+    assert [line.split(":")[0] for line in regressions] == ["overall.p99_ms", "overall.throughput_rps"]
@@ -0,0 +1,44 @@
+import pytest
+
+from services import bulk
+from services.post_service import PostService
+from services.user_service import UserService
+
+pytestmark = pytest.mark.usefixtures("totals")
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+
+
+def _user(n: int, email: str = None) -> dict:
+    return {"email": email or f"user{n}@example.com", "username": f"user{n}", "password": "x"}
+
+
+def test_bulk_users_report_each_row_across_chunks(db, cache):
+    users = UserService(db, cache)
+    results = users.create_users([_user(0), _user(1), _user(2, "user0@example.com"), _user(3), _user(4)])
+    assert ["id" in result for result in results] == [True, True, False, True, True]
+    assert "UNIQUE" in results[2]["error"]
+    assert users.count_users() == 4
+
+
+def test_bulk_posts_reject_unknown_authors_only(db, cache, user_id):
+    posts = PostService(db, cache)
+    results = posts.create_posts([
+        {"title": "A", "content": "a", "user_id": user_id},
+        {"title": "B", "content": "b", "user_id": 999},
+        {"title": "C", "content": "c", "user_id": user_id},
+    ])
+    assert ["id" in result for result in results] == [True, False, True]
+    assert "FOREIGN KEY" in results[1]["error"]
+    assert posts.count_posts() == 2
+
+
+def test_bulk_insert_in_a_session_is_one_transaction(db, cache):
+    with pytest.raises(RuntimeError):
+        with db.session() as session:
+            UserService(session, cache).create_users([_user(n) for n in range(5)])
+            raise RuntimeError("boom")
+    assert UserService(db, cache).count_users() == 0
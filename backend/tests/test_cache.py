@@ -0,0 +1,81 @@
+import pytest
+
+from services import cache as cache_module
+from services.cache import Cache, MemoryCache, RedisCache
+from services.user_service import UserService
+
+
+class FakeRedis:
+    """The slice of redis-py that RedisCache uses, with expiry recorded."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+        self.expiry[key] = ex
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+def test_cache_is_abstract():
+    with pytest.raises(TypeError):
+        Cache()
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(maxsize=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    cache.get("a")
+    cache.set("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = MemoryCache(ttl=10)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2}, ttl=60)
+    now[0] += 30
+    assert cache.get("a") is None
+    assert cache.get("b") == {"n": 2}
+    assert cache.stats()["expirations"] == 1
+
+
+def test_memory_cache_hands_out_copies():
+    cache = MemoryCache()
+    cache.set("a", {"n": 1})
+    cache.get("a")["n"] = 2
+    assert cache.get("a") == {"n": 1}
+
+
+def test_redis_cache_prefixes_keys_and_sets_expiry():
+    client = FakeRedis()
+    cache = RedisCache(client, ttl=30, prefix="t:")
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2}, ttl=0.5)
+    assert client.expiry == {"t:a": 30, "t:b": 1}
+    assert cache.get("a") == {"n": 1}
+    cache.delete("a", "b")
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_services_read_through_a_shared_cache(db, user_id):
+    cache = RedisCache(FakeRedis())
+    users = UserService(db, cache)
+    assert users.get_user_by_id(user_id)["email"] == "ada@example.com"
+    db.execute("UPDATE users SET username = 'stale' WHERE id = :id", {"id": user_id})
+    assert users.get_user_by_id(user_id)["username"] == "ada"
+    users.update_user(user_id, {"username": "grace"})
+    assert users.get_user_by_id(user_id)["username"] == "grace"
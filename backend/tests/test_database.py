@@ -0,0 +1,146 @@
+import sqlite3
+
+import pytest
+
+from db.database import ConnectionPool
+
+INSERT_USER = "INSERT INTO users (email, username, password) VALUES (:email, 'u', 'p')"
+COUNT_USERS = "SELECT COUNT(*) AS count FROM users"
+
+
+def count(db) -> int:
+    return db.fetch_one(COUNT_USERS)["count"]
+
+
+def test_pool_times_out_when_exhausted(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    pool.close()
+
+
+def test_pool_rejects_acquire_after_close(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1)
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_session_commits_on_exit(db):
+    with db.session() as session:
+        session.execute(INSERT_USER, {"email": "a@example.com"})
+        assert session.in_transaction
+        # Other connections do not see the write until it commits.
+        assert count(db) == 0
+    assert count(db) == 1
+
+
+def test_session_rolls_back_when_block_raises(db):
+    with pytest.raises(RuntimeError):
+        with db.session() as session:
+            session.execute(INSERT_USER, {"email": "a@example.com"})
+            raise RuntimeError("boom")
+    assert count(db) == 0
+
+
+def test_savepoint_rolls_back_only_its_writes(db):
+    with db.session() as session:
+        session.execute(INSERT_USER, {"email": "a@example.com"})
+        with pytest.raises(ValueError):
+            with session.savepoint():
+                session.execute(INSERT_USER, {"email": "b@example.com"})
+                raise ValueError("undo b")
+        session.execute(INSERT_USER, {"email": "c@example.com"})
+    emails = [row["email"] for row in db.fetch_all("SELECT email FROM users ORDER BY id")]
+    assert emails == ["a@example.com", "c@example.com"]
+
+
+def test_savepoint_needs_a_session(db):
+    with pytest.raises(RuntimeError):
+        with db.savepoint():
+            pass
+
+
+def test_execute_many_reports_failing_rows_and_keeps_the_rest(db):
+    results = db.execute_many(INSERT_USER, [
+        {"email": "a@example.com"},
+        {"email": "a@example.com"},
+        {"email": "b@example.com"},
+    ])
+    assert "lastrowid" in results[0] and "lastrowid" in results[2]
+    assert "UNIQUE" in results[1]["error"]
+    assert count(db) == 2
+
+
+def test_execute_many_joins_the_session_transaction(db):
+    with pytest.raises(RuntimeError):
+        with db.session() as session:
+            session.execute_many(INSERT_USER, [{"email": "a@example.com"}, {"email": "b@example.com"}])
+            raise RuntimeError("boom")
+    assert count(db) == 0
+
+
+def test_execute_returns_the_row_of_a_returning_statement(db):
+    result = db.execute(INSERT_USER + " RETURNING *", {"email": "a@example.com"})
+    assert result["row"]["email"] == "a@example.com"
+    assert result["row"]["is_active"] == 1
+
+
+def test_constraint_errors_propagate_from_execute(db):
+    db.execute(INSERT_USER, {"email": "a@example.com"})
+    with pytest.raises(sqlite3.IntegrityError):
+        db.execute(INSERT_USER, {"email": "a@example.com"})
+
+
+def test_on_commit_runs_after_commit(db):
+    calls = []
+    with db.session() as session:
+        session.execute(INSERT_USER, {"email": "a@example.com"})
+        session.on_commit(lambda: calls.append(count(db)))
+        assert calls == []
+    # The callback already sees the committed row.
+    assert calls == [1]
+
+
+def test_on_commit_is_dropped_on_rollback(db):
+    calls = []
+    with pytest.raises(RuntimeError):
+        with db.session() as session:
+            session.execute(INSERT_USER, {"email": "a@example.com"})
+            session.on_commit(lambda: calls.append("ran"))
+            raise RuntimeError("boom")
+    assert calls == []
+
+
+def test_on_commit_is_dropped_with_its_savepoint(db):
+    calls = []
+    with db.session() as session:
+        session.execute(INSERT_USER, {"email": "a@example.com"})
+        session.on_commit(lambda: calls.append("kept"))
+        with pytest.raises(ValueError):
+            with session.savepoint():
+                session.on_commit(lambda: calls.append("undone"))
+                raise ValueError
+    assert calls == ["kept"]
+
+
+def test_on_commit_runs_at_once_without_a_transaction(db):
+    calls = []
+    db.on_commit(lambda: calls.append("unbound"))
+    with db.session() as session:
+        session.on_commit(lambda: calls.append("no writes yet"))
+    assert calls == ["unbound", "no writes yet"]
+
+
+def test_statement_stats_count_only_application_queries(db):
+    before = db.statement_cache_stats()
+    with db.session() as session:
+        session.execute(INSERT_USER, {"email": "a@example.com"})
+        with session.savepoint():
+            session.execute(INSERT_USER, {"email": "b@example.com"})
+    after = db.statement_cache_stats()
+    lookups = (after["hits"] + after["misses"]) - (before["hits"] + before["misses"])
+    assert lookups == 2
@@ -0,0 +1,44 @@
+import pytest
+
+from api.responses import page_etag, row_etag
+
+pytestmark = pytest.mark.usefixtures("totals")
+
+
+def test_row_etag_follows_the_version():
+    assert row_etag("user", {"id": 3, "version": 2}) == 'W/"user-3-2"'
+
+
+def test_page_etag_changes_with_rows_authors_and_more():
+    rows = [{"id": 1, "version": 1, "author": {"id": 5, "version": 1}}]
+    tag = page_etag("posts", rows, False)
+    assert page_etag("posts", rows, True) != tag
+    assert page_etag("posts", [{**rows[0], "version": 2}], False) != tag
+    assert page_etag("posts", [{**rows[0], "author": {"id": 5, "version": 2}}], False) != tag
+    assert page_etag("posts", [dict(rows[0])], False) == tag
+
+
+def test_conditional_get_of_a_user(client, user_id):
+    first = client.get(f"/api/users/{user_id}")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    for header in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+        again = client.get(f"/api/users/{user_id}", headers={"If-None-Match": header})
+        assert again.status_code == 304 and again.content == b""
+    client.put(f"/api/users/{user_id}", json={"username": "grace"})
+    changed = client.get(f"/api/users/{user_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_conditional_get_of_a_post_and_listing(client, user_id):
+    post_id = client.post("/api/posts/", json={"title": "T", "content": "C", "author_id": user_id}).json()["id"]
+    etag = client.get(f"/api/posts/{post_id}").headers["ETag"]
+    assert client.get(f"/api/posts/{post_id}", headers={"If-None-Match": etag}).status_code == 304
+    listing = client.get("/api/posts/").headers["ETag"]
+    assert client.get("/api/posts/", headers={"If-None-Match": listing}).status_code == 304
+    client.put(f"/api/posts/{post_id}", json={"title": "Edited"})
+    assert client.get("/api/posts/", headers={"If-None-Match": listing}).status_code == 200
+    # Resubmitting the same values writes nothing, so the tag still holds.
+    etag = client.get(f"/api/posts/{post_id}").headers["ETag"]
+    client.put(f"/api/posts/{post_id}", json={"title": "Edited"})
+    assert client.get(f"/api/posts/{post_id}", headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,41 @@
+import pytest
+
+from services.post_service import PostService
+from services.user_service import UserService
+
+pytestmark = pytest.mark.usefixtures("totals")
+
+
+def test_expanded_pages_load_authors_in_one_query(db, cache, user_id):
+    other = UserService(db, cache).create_user("grace@example.com", "grace", "x")["id"]
+    posts = PostService(db, cache)
+    for author in (user_id, other, user_id):
+        posts.create_post("Title", "Body", author)
+    db.query_stats.reset()
+    page, _ = posts.get_posts_page(expand_author=True)
+    assert [post["author"]["username"] for post in page] == ["ada", "grace", "ada"]
+    assert "password" not in page[0]["author"]
+    lookups = [row for row in db.query_stats.top(100) if "FROM users" in row["fingerprint"]]
+    assert [row["calls"] for row in lookups] == [1]
+
+
+def test_unexpanded_posts_carry_no_author(db, cache, user_id):
+    PostService(db, cache).create_post("Title", "Body", user_id)
+    page, _ = PostService(db, cache).get_posts_page()
+    assert "author" not in page[0]
+
+
+def test_expand_author_on_the_routes(client, user_id):
+    client.post("/api/posts/", json={"title": "Rye", "content": "loaf", "author_id": user_id})
+    for path, params in (
+        ("/api/posts/", {}),
+        (f"/api/posts/user/{user_id}", {}),
+        ("/api/posts/search", {"q": "loaf"}),
+    ):
+        plain = client.get(path, params=params).json()[0]
+        expanded = client.get(path, params={**params, "expand": "author"}).json()[0]
+        assert "author" not in plain
+        assert expanded["author"] == {
+            "id": user_id, "email": "ada@example.com", "username": "ada", "is_active": True,
+        }
+    assert client.get("/api/posts/", params={"expand": "comments"}).status_code == 422
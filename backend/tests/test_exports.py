@@ -0,0 +1,37 @@
+import asyncio
+import json
+from contextlib import aclosing
+
+from db.async_database import AsyncDatabase
+from services.post_service import AsyncPostService, PostService
+from services.user_service import UserService
+
+
+def test_export_reports_is_active_as_boolean(db, cache, user_id):
+    rows = list(UserService(db, cache).iter_users())
+    assert rows[0]["is_active"] is True
+    assert "password" not in rows[0]
+
+
+def test_abandoned_export_returns_its_connection(db, cache, user_id):
+    for n in range(3):
+        PostService(db, cache).create_post(f"Post {n}", "body", user_id)
+    engine = AsyncDatabase(db)
+
+    async def first_post():
+        async with aclosing(AsyncPostService(engine, cache).iter_posts()) as rows:
+            async for row in rows:
+                return row
+
+    assert asyncio.run(first_post())["title"] == "Post 0"
+    assert db.pool._idle.qsize() == db.pool._opened
+    engine.executor.shutdown()
+
+
+def test_export_routes_stream_ndjson(client, user_id):
+    client.post("/api/posts/", json={"title": "T", "content": "C", "author_id": user_id})
+    response = client.get("/api/users/export")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["email"] for line in response.text.splitlines()] == ["ada@example.com"]
+    posts = [json.loads(line) for line in client.get("/api/posts/export").text.splitlines()]
+    assert [(post["title"], post["author_id"]) for post in posts] == [("T", user_id)]
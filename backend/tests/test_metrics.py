@@ -0,0 +1,52 @@
+import threading
+
+import metrics
+from metrics import Counter, Histogram, Registry
+
+
+def test_counter_merges_every_thread_shard():
+    counter = Counter("hits_total", "Hits.", ("route",))
+
+    def record():
+        for _ in range(1000):
+            counter.inc(("/a",))
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(counter._shards) == 4
+    assert list(counter.samples()) == [("hits_total", ("/a",), 4000)]
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(("/a",), value)
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+
+
+def _requests(method, route, status):
+    return sum(
+        value for _, labels, value in metrics.http_requests.samples()
+        if labels == (method, route, status)
+    )
+
+
+def test_requests_are_labelled_with_the_route_template(client, user_id):
+    before = _requests("GET", "/api/users/{user_id}", "200")
+    unmatched = _requests("GET", "<unmatched>", "404")
+    client.get(f"/api/users/{user_id}")
+    client.get(f"/api/users/{user_id}")
+    client.get("/no/such/path")
+    assert _requests("GET", "/api/users/{user_id}", "200") == before + 2
+    assert _requests("GET", "<unmatched>", "404") == unmatched + 1
+    labels = {labels[1] for _, labels, _ in metrics.http_requests.samples()}
+    assert f"/api/users/{user_id}" not in labels
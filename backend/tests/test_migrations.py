@@ -0,0 +1,23 @@
+from db.database import Database
+from db.migrations import MIGRATIONS, run_migrations
+
+
+def test_migrations_apply_once(tmp_path):
+    db = Database(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert run_migrations(db) == [version for version, _, _ in MIGRATIONS]
+    assert run_migrations(db) == []
+    recorded = [row["version"] for row in db.fetch_all("SELECT version FROM schema_migrations ORDER BY version")]
+    assert recorded == [version for version, _, _ in MIGRATIONS]
+    db.disconnect()
+
+
+def test_schema_has_the_lookup_indexes(db):
+    indexes = {row["name"] for row in db.fetch_all("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"ux_users_email", "ix_posts_user_id_created_at", "ix_posts_created_at"} <= indexes
+
+
+def test_constraint_violations_answer_4xx(client, user_id):
+    taken = client.post("/api/users/", json={"email": "ada@example.com", "username": "ada", "password": "x"})
+    assert taken.status_code == 400
+    orphan = client.post("/api/posts/", json={"title": "T", "content": "C", "author_id": 999})
+    assert (orphan.status_code, orphan.json()["detail"]) == (422, "Author not found")
@@ -0,0 +1,106 @@
+import base64
+import json
+
+import pytest
+
+from services.pagination import InvalidCursor, clamp_limit, decode_cursor, encode_cursor, split_page
+from services.post_service import PostService
+from services.user_service import UserService
+
+pytestmark = pytest.mark.usefixtures("totals")
+
+
+@pytest.mark.parametrize("values, types", [
+    ((42,), (int,)),
+    (("2024-01-01 00:00:00.000", 7), (str, int)),
+    ((-3.25, 9), (float, int)),
+])
+def test_cursor_round_trip(values, types):
+    token = encode_cursor(*values)
+    assert "=" not in token
+    assert decode_cursor(token, *types) == list(values)
+
+
+def _token(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "not base64 at all!",
+    _token({"id": 1}),
+    _token([1, 2]),
+    _token(["1"]),
+    _token([True]),
+    _token([1.5]),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, int)
+
+
+def test_split_page_reports_more_rows():
+    assert split_page([1, 2, 3], 2) == ([1, 2], True)
+    assert split_page([1, 2], 2) == ([1, 2], False)
+
+
+@pytest.mark.parametrize("requested, expected", [(0, 1), (50, 50), (10_000, 500)])
+def test_clamp_limit(requested, expected):
+    assert clamp_limit(requested) == expected
+
+
+def _insert_posts(db, user_id, created_at):
+    """Posts with the given created_at values, in insertion (id) order."""
+    return [
+        db.execute(
+            "INSERT INTO posts (title, content, user_id, created_at) VALUES ('t', 'c', :user_id, :created_at)",
+            {"user_id": user_id, "created_at": stamp}
+        )["lastrowid"]
+        for stamp in created_at
+    ]
+
+
+def _walk(fetch_page, cursor_of, limit):
+    seen, after = [], None
+    while True:
+        page, has_more = fetch_page(limit=limit, after=after)
+        seen.extend(row["id"] for row in page)
+        if not has_more:
+            return seen
+        after = cursor_of(page[-1])
+
+
+def test_user_pages_seek_past_the_cursor(db, cache):
+    users = UserService(db, cache)
+    ids = [users.create_user(f"{n}@example.com", f"u{n}", "x")["id"] for n in range(5)]
+    assert _walk(users.get_users_page, users.user_cursor, 2) == ids
+    first, _ = users.get_users_page(limit=2)
+    # Rows removed before the cursor do not shift the next page.
+    users.delete_user(ids[0])
+    page, _ = users.get_users_page(limit=2, after=users.user_cursor(first[-1]))
+    assert [user["id"] for user in page] == ids[2:4]
+
+
+def test_post_pages_break_created_at_ties_by_id(db, cache, user_id):
+    ids = _insert_posts(db, user_id, ["2024-01-02", "2024-01-01", "2024-01-01", "2024-01-01", "2024-01-03"])
+    posts = PostService(db, cache)
+    expected = [ids[4], ids[0], ids[3], ids[2], ids[1]]
+    assert _walk(posts.get_posts_page, posts.post_cursor, 2) == expected
+    by_user = _walk(
+        lambda **page: posts.get_user_posts_page(user_id, **page), posts.post_cursor, 2
+    )
+    assert by_user == expected
+
+
+def test_listing_routes_hand_out_cursors(client, user_id):
+    for n in range(3):
+        created = client.post("/api/posts/", json={"title": f"P{n}", "content": "c", "author_id": user_id})
+        assert created.status_code == 200
+    first = client.get("/api/posts/", params={"limit": 2})
+    assert first.headers["X-Has-More"] == "true"
+    second = client.get("/api/posts/", params={"limit": 2, "after": first.headers["X-Next-Cursor"]})
+    assert second.headers["X-Has-More"] == "false"
+    titles = [post["title"] for post in first.json() + second.json()]
+    assert titles == ["P2", "P1", "P0"]
+    assert client.get("/api/users/", params={"after": "garbage"}).status_code == 400
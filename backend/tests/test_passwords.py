@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from db.async_database import AsyncDatabase
+from services import auth_service, cache as cache_module
+from services.auth_service import AsyncAuthService, AuthService
+from services.passwords import PasswordHasher, PasswordHasherBusy
+from services.user_service import AsyncUserService, DuplicateEmail
+
+# Cheap parameters; the tests only care which cost a hash was made with.
+OLD_COST = PasswordHasher(log_n=4)
+CURRENT_COST = PasswordHasher(log_n=5)
+
+
+def _user_with_hash(db, encoded: str) -> dict:
+    return db.execute(
+        "INSERT INTO users (email, username, password) VALUES ('ada@example.com', 'ada', :password) RETURNING *",
+        {"password": encoded}
+    )["row"]
+
+
+def test_old_cost_and_plain_text_need_rehash():
+    assert CURRENT_COST.needs_rehash(OLD_COST.hash("secret"))
+    assert CURRENT_COST.needs_rehash("secret")
+    assert not CURRENT_COST.needs_rehash(CURRENT_COST.hash("secret"))
+    # Verification uses the parameters stored with the hash.
+    assert CURRENT_COST.verify("secret", OLD_COST.hash("secret"))
+
+
+def test_login_rehashes_with_the_current_cost(db):
+    user = _user_with_hash(db, OLD_COST.hash("secret"))
+    assert AuthService(db, CURRENT_COST).authenticate("ada@example.com", "secret")
+    stored = db.fetch_one("SELECT password FROM users WHERE id = :id", {"id": user["id"]})["password"]
+    assert not CURRENT_COST.needs_rehash(stored)
+    assert CURRENT_COST.verify("secret", stored)
+
+
+def test_rehash_does_not_overwrite_a_concurrent_change(db):
+    user = _user_with_hash(db, OLD_COST.hash("secret"))
+    db.execute("UPDATE users SET password = 'changed' WHERE id = :id", {"id": user["id"]})
+    assert AuthService(db, CURRENT_COST).rehash_password(user, CURRENT_COST.hash("secret")) is False
+    assert db.fetch_one("SELECT password FROM users WHERE id = :id", {"id": user["id"]})["password"] == "changed"
+
+
+def test_async_rehash_outlives_the_login_session(db, cache, monkeypatch):
+    monkeypatch.setattr(cache_module, "_cache", cache)
+    user = _user_with_hash(db, OLD_COST.hash("secret"))
+    engine = AsyncDatabase(db)
+
+    async def login():
+        async with engine.session() as session:
+            result = await AsyncAuthService(session, CURRENT_COST).authenticate("ada@example.com", "secret")
+        # The upgrade runs after the session has given its connection back.
+        await asyncio.gather(*auth_service._rehash_tasks)
+        return result
+
+    assert asyncio.run(login())["user_id"] == user["id"]
+    stored = db.fetch_one("SELECT password FROM users WHERE id = :id", {"id": user["id"]})["password"]
+    assert not CURRENT_COST.needs_rehash(stored)
+
+
+def test_hasher_refuses_work_beyond_max_pending():
+    hasher = PasswordHasher(log_n=4, max_workers=1, max_pending=1)
+
+    async def burst():
+        return await asyncio.gather(*(hasher.hash_async("secret") for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(result, PasswordHasherBusy) for result in results) == 2
+    assert hasher.pending == 0
+
+
+def test_hash_many_keeps_input_order():
+    hasher = PasswordHasher(log_n=4, max_workers=2, max_pending=4)
+    hashes = asyncio.run(hasher.hash_many_async([f"secret{n}" for n in range(5)]))
+    assert [hasher.verify(f"secret{n}", encoded) for n, encoded in enumerate(hashes)] == [True] * 5
+
+
+def test_register_stores_a_hash_and_rejects_taken_emails(db, cache, hasher):
+    users = AsyncUserService(AsyncDatabase(db), cache)
+    user = asyncio.run(users.register("ada@example.com", "ada", "secret"))
+    stored = db.fetch_one("SELECT password FROM users WHERE id = :id", {"id": user["id"]})["password"]
+    assert hasher.verify("secret", stored)
+    with pytest.raises(DuplicateEmail):
+        asyncio.run(users.register("ada@example.com", "other", "secret"))
+
+
+def test_busy_hasher_answers_503(client, hasher):
+    hasher.max_pending = 0
+    response = client.post("/api/auth/register", json={"email": "a@example.com", "username": "a", "password": "x"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert client.post("/api/users/", json={"email": "a@example.com", "username": "a", "password": "x"}).status_code == 503
@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+
+from api import admin
+from db.query_log import QueryStats, fingerprint, redact
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT * FROM users WHERE id = 42", "SELECT * FROM users WHERE id = ?"),
+    ("SELECT * FROM users WHERE email = 'o''brien@example.com'", "SELECT * FROM users WHERE email = ?"),
+    ("SELECT *\n  FROM users   WHERE id IN (:a, :b, :c)", "SELECT * FROM users WHERE id IN (...)"),
+    ("SELECT * FROM users WHERE id = :id LIMIT :limit", "SELECT * FROM users WHERE id = :id LIMIT :limit"),
+    ("SELECT * FROM t2 WHERE x = -1.5", "SELECT * FROM t2 WHERE x = ?"),
+])
+def test_fingerprint(query, expected):
+    assert fingerprint(query) == expected
+
+
+def test_stats_aggregate_and_sort():
+    stats = QueryStats(slow_query_ms=-1)
+    stats.record("A", None, 0.030, 1)
+    stats.record("A", None, 0.040, 2)
+    stats.record("B", None, 0.050, 0)
+    by_total, = stats.top(1)
+    assert (by_total["fingerprint"], by_total["calls"], by_total["rows"]) == ("A", 2, 3)
+    assert by_total["max_ms"] == pytest.approx(40)
+    assert [row["fingerprint"] for row in stats.top(sort="max_ms")] == ["B", "A"]
+    with pytest.raises(ValueError):
+        stats.top(sort="nope")
+
+
+def test_stats_fold_new_fingerprints_past_the_limit():
+    stats = QueryStats(slow_query_ms=-1, max_fingerprints=2)
+    for text in ("A", "B", "C", "D"):
+        stats.record(text, None, 0.001, 0)
+    calls = {row["fingerprint"]: row["calls"] for row in stats.top()}
+    assert calls == {"A": 1, "B": 1, "<other queries>": 2}
+
+
+def test_slow_queries_are_logged_without_values(caplog):
+    stats = QueryStats(slow_query_ms=5)
+    with caplog.at_level(logging.WARNING, logger="db.query_log"):
+        stats.record("SELECT :email", {"email": "ada@example.com"}, 0.001, 1)
+        stats.record("SELECT :email", {"email": "ada@example.com"}, 0.010, 1)
+    assert len(caplog.records) == 1
+    assert "ada@example.com" not in caplog.text
+    assert redact({"email": "x", "id": 1}) == {"email": "str", "id": "int"}
+
+
+def test_database_records_each_statement(db, user_id):
+    db.query_stats.reset()
+    db.fetch_one("SELECT * FROM users WHERE id = 1")
+    db.fetch_one("SELECT * FROM users WHERE id = 2")
+    row, = db.query_stats.top()
+    assert (row["fingerprint"], row["calls"], row["rows"]) == ("SELECT * FROM users WHERE id = ?", 2, 1)
+
+
+def test_admin_queries_route(client, db, monkeypatch):
+    assert client.get("/api/admin/queries").status_code == 404
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/api/admin/queries").status_code == 403
+    assert client.get("/api/admin/queries", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    client.get("/api/users/")
+    report = client.get("/api/admin/queries", params={"sort": "calls"}, headers={"X-Admin-Token": "s3cret"})
+    assert report.status_code == 200
+    assert any("FROM users" in row["fingerprint"] for row in report.json()["queries"])
+    assert client.delete("/api/admin/queries", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+    assert db.query_stats.top() == []
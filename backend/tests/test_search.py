@@ -0,0 +1,70 @@
+import pytest
+
+from db.migrations import MIGRATIONS
+from services.post_service import PostService, match_expression
+from services.user_service import UserService
+
+pytestmark = pytest.mark.usefixtures("totals")
+
+
+def test_search_escapes_snippets(db, cache, user_id):
+    posts = PostService(db, cache)
+    posts.create_post("Alerts", "see <script>alert(1)</script> & more", user_id)
+    (result,), has_more = posts.search_posts("alert")
+    assert not has_more
+    assert "<script>" not in result["snippet"]
+    assert "&lt;script&gt;<mark>alert</mark>(1)" in result["snippet"]
+
+
+def test_search_index_follows_writes(db, cache, user_id):
+    posts = PostService(db, cache)
+    post_id = posts.create_post("Sourdough", "starter and flour", user_id)["id"]
+    posts.update_post(post_id, {"title": "Rye"})
+    assert posts.search_posts("sourdough")[0] == []
+    assert [post["id"] for post in posts.search_posts("rye")[0]] == [post_id]
+    UserService(db, cache).delete_user(user_id)
+    assert posts.search_posts("rye")[0] == []
+
+
+def test_search_pages_through_every_match(db, cache, user_id):
+    posts = PostService(db, cache)
+    created = {posts.create_post(f"Bread {n}", "loaf", user_id)["id"] for n in range(5)}
+    seen, after = [], None
+    while True:
+        page, has_more = posts.search_posts("loaf", limit=2, after=after)
+        seen.extend(post["id"] for post in page)
+        if not has_more:
+            break
+        after = posts.search_cursor(page[-1])
+    assert sorted(seen) == sorted(created)
+
+
+def test_search_treats_operators_as_words(db, cache, user_id):
+    PostService(db, cache).create_post("Title", "plain text", user_id)
+    assert PostService(db, cache).search_posts('"OR NEAR( *')[0] == []
+    assert PostService(db, cache).search_posts("!!!") == ([], False)
+
+
+def test_match_expression_quotes_each_word():
+    assert match_expression("rye  bread!") == '"rye" "bread"'
+    assert match_expression("  ") is None
+
+
+def test_stored_markers_cannot_inject_markup(db, cache, user_id):
+    posts = PostService(db, cache)
+    post = posts.create_post("Plain", "loaf \x02<b>\x03 crust", user_id)
+    assert post["content"] == "loaf <b> crust"
+    posts.update_post(post["id"], {"title": "\x02x\x03"})
+    (result,), _ = posts.search_posts("crust")
+    assert result["title"] == "x"
+    assert result["snippet"] == "loaf &lt;b&gt; <mark>crust</mark>"
+
+
+def test_migration_strips_markers_from_existing_posts(db, user_id):
+    db.execute(
+        "INSERT INTO posts (title, content, user_id) VALUES (char(2) || 'T', 'a' || char(3), :user_id)",
+        {"user_id": user_id}
+    )
+    statement, = next(statements for version, _, statements in MIGRATIONS if version == 6)
+    db.execute(statement)
+    assert db.fetch_one("SELECT title, content FROM posts") == {"title": "T", "content": "a"}
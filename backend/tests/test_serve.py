@@ -0,0 +1,25 @@
+import serve
+from serve import Master
+
+
+def test_failed_replacements_back_off(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(serve.time, "monotonic", lambda: now[0])
+    master = Master(sock=None, workers=1, graceful_timeout=1, ready_timeout=1)
+    outcomes = iter([None, None, 4242])
+    attempts = []
+
+    def spawn():
+        attempts.append(now[0])
+        return next(outcomes)
+
+    monkeypatch.setattr(master, "spawn", spawn)
+    master.missing = 1
+    master._replace_missing()
+    master._replace_missing()  # still inside the backoff
+    now[0] += serve.SPAWN_BACKOFF_MIN
+    master._replace_missing()
+    now[0] += 2 * serve.SPAWN_BACKOFF_MIN
+    master._replace_missing()
+    assert attempts == [100.0, 101.0, 103.0]
+    assert (master.missing, master.backoff) == (0, serve.SPAWN_BACKOFF_MIN)
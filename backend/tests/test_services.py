@@ -0,0 +1,86 @@
+import pytest
+
+from services.post_service import PostService, UnknownAuthor
+from services.user_service import DuplicateEmail, UserService
+
+
+pytestmark = pytest.mark.usefixtures("totals")
+
+
+def test_update_invalidates_cache_only_after_commit(db, cache, user_id):
+    users = UserService(db, cache)
+    with db.session() as session:
+        UserService(session, cache).update_user(user_id, {"username": "grace"})
+        # A concurrent read caches the committed (old) row...
+        assert users.get_user_by_id(user_id)["username"] == "ada"
+    # ...and the commit evicts it.
+    user = users.get_user_by_id(user_id)
+    assert (user["username"], user["version"]) == ("grace", 2)
+
+
+def test_rolled_back_update_leaves_cache_alone(db, cache, user_id):
+    users = UserService(db, cache)
+    users.get_user_by_id(user_id)
+    with pytest.raises(RuntimeError):
+        with db.session() as session:
+            UserService(session, cache).update_user(user_id, {"username": "grace"})
+            raise RuntimeError("boom")
+    assert cache.get(f"user:{user_id}")["username"] == "ada"
+
+
+def test_post_update_invalidates_cache_after_commit(db, cache, user_id):
+    posts = PostService(db, cache)
+    post_id = posts.create_post("Title", "Body", user_id)["id"]
+    with db.session() as session:
+        PostService(session, cache).update_post(post_id, {"title": "Edited"})
+        posts.get_post_by_id(post_id)
+    assert posts.get_post_by_id(post_id)["title"] == "Edited"
+
+
+def test_totals_change_only_after_commit(db, cache, totals):
+    users_total, _ = totals
+    users = UserService(db, cache)
+    assert users.count_users() == 0
+    with db.session() as session:
+        UserService(session, cache).create_user("a@example.com", "a", "x")
+        assert users.count_users() == 0
+    assert users.count_users() == 1
+    with pytest.raises(RuntimeError):
+        with db.session() as session:
+            UserService(session, cache).create_user("b@example.com", "b", "x")
+            raise RuntimeError("boom")
+    assert users.count_users() == 1
+
+
+def test_duplicate_email_raises(db, cache, user_id):
+    users = UserService(db, cache)
+    with pytest.raises(DuplicateEmail):
+        users.create_user("ada@example.com", "other", "x")
+    other = users.create_user("grace@example.com", "grace", "x")
+    with pytest.raises(DuplicateEmail):
+        users.update_user(other["id"], {"email": "ada@example.com"})
+
+
+def test_post_for_unknown_author_raises(db, cache):
+    with pytest.raises(UnknownAuthor):
+        PostService(db, cache).create_post("Title", "Body", 999)
+
+
+def test_deletes_report_missing_rows(db, cache, user_id):
+    posts = PostService(db, cache)
+    post_id = posts.create_post("Title", "Body", user_id)["id"]
+    assert posts.delete_post(post_id) is True
+    assert posts.delete_post(post_id) is False
+    users = UserService(db, cache)
+    assert users.delete_user(user_id) is True
+    assert users.delete_user(user_id) is False
+
+
+def test_rows_read_in_a_transaction_are_not_cached(db, cache, user_id):
+    with db.session() as session:
+        session.execute("UPDATE users SET username = 'grace' WHERE id = :id", {"id": user_id})
+        assert UserService(session, cache).get_user_by_id(user_id)["username"] == "grace"
+        assert UserService(session, cache).get_user_by_email("ada@example.com")["username"] == "grace"
+        assert cache.get(f"user:{user_id}") is None
+    UserService(db, cache).get_user_by_email("ada@example.com")
+    assert cache.get("user:email:ada@example.com") == {"id": user_id}
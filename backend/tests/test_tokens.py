@@ -0,0 +1,46 @@
+import time
+
+from services import tokens
+from services.tokens import create_token, decode_token
+
+SECRET = "test-secret"
+
+
+def test_token_round_trip():
+    token = create_token(7, {"email": "ada@example.com"}, secret=SECRET)
+    claims = decode_token(token, secret=SECRET)
+    assert claims["user_id"] == 7
+    assert claims["email"] == "ada@example.com"
+
+
+def test_expired_token_is_rejected():
+    assert decode_token(create_token(7, ttl=-1, secret=SECRET), secret=SECRET) is None
+
+
+def test_cached_token_expires(monkeypatch):
+    token = create_token(7, ttl=60, secret=SECRET)
+    assert decode_token(token, secret=SECRET) is not None
+    later = time.time() + 120
+    monkeypatch.setattr(tokens.time, "time", lambda: later)
+    assert decode_token(token, secret=SECRET) is None
+
+
+def test_tampered_payload_is_rejected():
+    header, payload, signature = create_token(7, secret=SECRET).split(".")
+    forged = tokens._b64encode(b'{"sub":"1","exp":9999999999}').decode()
+    assert decode_token(f"{header}.{forged}.{signature}", secret=SECRET) is None
+
+
+def test_tampered_signature_is_rejected():
+    token = create_token(7, secret=SECRET)
+    flipped = token[:-1] + ("A" if token[-1] != "A" else "B")
+    assert decode_token(flipped, secret=SECRET) is None
+
+
+def test_token_signed_with_another_secret_is_rejected():
+    assert decode_token(create_token(7, secret="other"), secret=SECRET) is None
+
+
+def test_garbage_is_rejected():
+    assert decode_token("not.a.token", secret=SECRET) is None
+    assert decode_token("", secret=SECRET) is None
@@ -0,0 +1,50 @@
+import threading
+
+from services.updates import supplied_fields, update_statement
+from services.user_service import UserService
+
+
+def test_update_statement_sets_and_compares_only_the_given_columns():
+    sql = update_statement("users", ("username",))
+    assert sql == (
+        "UPDATE users SET username = :username, version = version + 1 "
+        "WHERE id = :id AND (username IS NOT :username) RETURNING *"
+    )
+    assert update_statement("users", ("username",)) is sql
+
+
+def test_supplied_fields_ignore_unknown_keys_and_none():
+    data = {"username": "grace", "email": None, "password": "x"}
+    assert supplied_fields(data, ("email", "username")) == {"username": "grace"}
+
+
+def test_unchanged_update_keeps_the_version(db, cache, user_id):
+    users = UserService(db, cache)
+    user = users.update_user(user_id, {"username": "ada", "email": "ada@example.com"})
+    assert (user["username"], user["version"]) == ("ada", 1)
+    assert users.update_user(user_id, {}) == user
+
+
+def test_update_writes_when_any_field_changes(db, cache, user_id):
+    user = UserService(db, cache).update_user(user_id, {"username": "grace", "email": "ada@example.com"})
+    assert (user["username"], user["email"], user["version"]) == ("grace", "ada@example.com", 2)
+
+
+def test_update_of_unknown_row_returns_none(db, cache):
+    assert UserService(db, cache).update_user(999, {"username": "grace"}) is None
+    assert UserService(db, cache).update_user(999, {}) is None
+
+
+def test_update_compares_against_the_latest_commit(db, cache, user_id):
+    # The concurrent update below commits "grace" while this one waits for
+    # the write lock; setting "ada" back must still be written.
+    results = []
+    with db.session() as session:
+        UserService(session, cache).update_user(user_id, {"username": "grace"})
+        writer = threading.Thread(
+            target=lambda: results.append(UserService(db, cache).update_user(user_id, {"username": "ada"}))
+        )
+        writer.start()
+        writer.join(0.2)
+    writer.join()
+    assert (results[0]["username"], results[0]["version"]) == ("ada", 3)
@@ -0,0 +1,38 @@
+"""
+Warm-up - prime a worker's connections and caches before it takes traffic
+"""
+
+import os
+from contextlib import ExitStack
+
+from db.database import Database
+from services.post_service import PostService
+from services.user_service import UserService
+
+# Newest posts (and their authors) loaded into the cache at startup
+WARMUP_POSTS = int(os.environ.get("WARMUP_POSTS", 100))
+
+
+def warm_up(db: Database) -> dict:
+    """Open every pooled connection, prepare the hot reads on each and fill the cache.
+
+    The first requests a worker serves then find open connections, compiled
+    statements, a warm SQLite page cache and cached rows, instead of paying
+    for all of them at once.
+    """
+    with ExitStack() as stack:
+        # Hold every connection at once so each one gets opened and primed.
+        handles = [stack.enter_context(db.session()) for _ in range(db.pool_size)]
+        for handle in handles:
+            users = UserService(handle)
+            posts = PostService(handle)
+            users.get_users_page(limit=1)
+            users.get_user_by_id(0)
+            users.get_users_by_ids([0])
+            users.get_user_by_email("")
+            posts.get_posts_page(limit=1)
+            posts.get_user_posts_page(0, limit=1)
+            posts.get_post_by_id(0)
+            posts.search_posts("warmup", limit=1)
+        cached = PostService(handles[0]).warm_cache(WARMUP_POSTS) if WARMUP_POSTS > 0 else 0
+    return {"connections": len(handles), "cached_posts": cached}
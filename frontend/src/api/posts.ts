@@ -3,12 +3,14 @@
  */
 
 import { apiClient } from "./client"
+import type { User } from "./users"
 
 export interface Post {
   id: number
   title: string
   content: string
   user_id: number
+  author?: User
 }
 
 export interface CreatePostRequest {
@@ -22,8 +24,9 @@ export interface UpdatePostRequest {
   content?: string
 }
 
-export async function getPosts(): Promise<Post[]> {
-  const response = await apiClient.get("/api/posts")
+export async function getPosts(options: { expandAuthor?: boolean } = {}): Promise<Post[]> {
+  const params = options.expandAuthor ? { expand: "author" } : undefined
+  const response = await apiClient.get("/api/posts", { params })
   return response.data
 }
 
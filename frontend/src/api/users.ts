@@ -31,6 +31,11 @@ export async function getUserById(userId: number): Promise<User> {
   return response.data
 }
 
+export async function getUsersByIds(userIds: number[]): Promise<Record<number, User>> {
+  const response = await apiClient.post("/api/users/batch", { ids: userIds })
+  return response.data
+}
+
 export async function createUser(data: CreateUserRequest): Promise<User> {
   const response = await apiClient.post("/api/users", data)
   return response.data
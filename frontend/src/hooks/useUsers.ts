@@ -32,6 +32,17 @@ export function useUsers() {
     }
   }, [])
 
+  const fetchUsersByIds = useCallback(async (userIds: number[]): Promise<Record<number, User>> => {
+    if (userIds.length === 0) return {}
+    const response = await fetch(`${API_URL}/api/users/batch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ ids: Array.from(new Set(userIds)) }),
+    })
+    if (!response.ok) throw new Error("Failed to fetch users")
+    return response.json()
+  }, [])
+
   const createUser = useCallback(async (userData: { email: string; username: string; password: string }) => {
     setLoading(true)
     try {
@@ -69,5 +80,5 @@ export function useUsers() {
     fetchUsers()
   }, [fetchUsers])
 
-  return { users, loading, error, fetchUsers, createUser, deleteUser }
+  return { users, loading, error, fetchUsers, fetchUsersByIds, createUser, deleteUser }
 }